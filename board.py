@@ -16,6 +16,13 @@ import numpy as np
 import copy
 from datetime import datetime, timedelta
 
+from engine.constants import square, KNIGHT, BISHOP, ROOK, QUEEN
+from engine.position import Position, CASTLE_ROOK_SQUARES
+from engine.movegen import legal_moves_from, is_in_check, game_result, CHECKMATE, STALEMATE
+from engine.moves import (from_square, to_square, move_flag, is_castle, is_promotion, promotion_type,
+                          EP_CAPTURE)
+from engine.service import shared_service
+
 from theme_manager import ManageTheme
 from game_manager import ManageGame
 from sound_manager import ManageSound
@@ -56,6 +63,24 @@ BLK_POS = {
     "king": [7, 4]
 }
 
+# Search limit for the computer player: it deepens until the time manager's budget for the
+# move, taken from its clock, runs out. The search runs in the background, so the window
+# keeps drawing and the clocks keep running while it thinks
+COMPUTER_MAX_DEPTH = 64
+# Whether the computer keeps thinking about the expected reply during the player's turn
+COMPUTER_PONDER = True
+# Processes the computer searches with; more than 1 shares the search with helper processes
+COMPUTER_THREADS = 1
+# Worker processes of the engine service shared by every board in this process; 0 searches
+# on a thread of each board's own instead
+COMPUTER_SERVICE_WORKERS = 0
+
+# Column the King castles to when the rook in each corner column is clicked
+ROOK_CASTLE_COLS = {0: 2, 7: 6}
+
+# Sprite class for each piece type a pawn can promote to
+PROMOTION_PIECES = {KNIGHT: p.Knight, BISHOP: p.Bishop, ROOK: p.Rook, QUEEN: p.Queen}
+
 # Define allegiances for white and black pieces
 white_allegiance = "White"
 black_allegiance = "Black"
@@ -89,6 +114,8 @@ class Board(arcade.View):
         # is there a selected position
         arcade.set_background_color(arcade.color.WHITE)
         self.board = np.array([[None for _ in range(COLS)] for _ in range(ROWS)])
+        # The rules-core position the sprites on the board are displaying
+        self.position = Position()
         self.prev_board = copy.copy(self.board)
         self.selected_piece = None
         self.computer_piece = None
@@ -102,7 +129,9 @@ class Board(arcade.View):
 
         # testing Computer
         # this takes in an allegiance and the board array containing pieces
-        self.computer = computer.Computer('Black', self.board)
+        service = shared_service(COMPUTER_SERVICE_WORKERS) if COMPUTER_SERVICE_WORKERS else None
+        self.computer = computer.Computer('Black', self.board, self.position, threads=COMPUTER_THREADS,
+                                          service=service)
 
         # 2D list to keep track of whether each square is selected
         # I made this separate from the board array, since the board array
@@ -200,6 +229,10 @@ class Board(arcade.View):
 
             self.current_turn_start = datetime.now()
 
+        # Play the computer's move once its background search has finished
+        if self.computer.job is not None and self.computer.job.done():
+            self.finish_computer_turn()
+
         # Put conditions on the piece the user will select
         if self.selected_piece is not None:
             self.selected_piece.update()
@@ -211,19 +244,24 @@ class Board(arcade.View):
 
                 """ Check for pawn promotion """
                 if not self.promotion_triggered:
-                    # Allows pawn to move to position before promoting to queen
+                    # Allows pawn to move to position before promoting; the player always
+                    # promotes to a queen, the computer to the piece its move chose
                     if self.selected_piece.promotable():
-                        self.promote_pawn_to_queen(self.selected_piece.current_row, self.selected_piece.current_col)
+                        self.promote_pawn(self.selected_piece.current_row, self.selected_piece.current_col, QUEEN)
                         self.promotion_triggered = True
-                    elif self.computer_piece is not None and self.computer_piece.promotable():
-                        self.promote_pawn_to_queen(self.computer_piece.current_row, self.computer_piece.current_col)
+                    elif (self.computer_piece is not None and self.computer_piece.promotable()
+                          and is_promotion(self.computer.chosen_move)):
+                        self.promote_pawn(self.computer_piece.current_row, self.computer_piece.current_col,
+                                          promotion_type(self.computer.chosen_move))
                         self.promotion_triggered = True
 
         if game_manager.get_game_type() == "Replay":
             game_manager.set_game_type("_")
+            self.computer.cancel()
             self.__init__(self.versus)
         elif game_manager.get_game_type() == "Main_Menu":
             game_manager.set_game_type("_")
+            self.computer.cancel()
             game_view = menu.MenuView(theme_manager.theme, sound_manager.get_volume())
             self.window.show_view(game_view)
 
@@ -408,6 +446,10 @@ class Board(arcade.View):
             # Piece is still moving, do not allow any interaction
             return
 
+        if self.versus == "computer" and (self.current_turn == black_allegiance or self.computer.job is not None):
+            # The computer is thinking, and on_update plays its move once the search is done
+            return
+
         # Start the timer when a player makes a move
         self.current_turn_start = datetime.now()
 
@@ -490,38 +532,38 @@ class Board(arcade.View):
         allegiance = 'Black'
 
         # Bishops in Column 2, 4 Row 0
-        bishop_1 = p.Bishop(allegiance, self.board, BLK_POS['bishop'][0])
+        bishop_1 = p.Bishop(allegiance, self.board, BLK_POS['bishop'][0], self.position)
         self.add_to_board(bishop_1, BLK_POS['bishop'][0])
 
-        bishop_2 = p.Bishop(allegiance, self.board, BLK_POS['bishop'][1])
+        bishop_2 = p.Bishop(allegiance, self.board, BLK_POS['bishop'][1], self.position)
         self.add_to_board(bishop_2, BLK_POS['bishop'][1])
 
         # # Queen
-        queen = p.Queen(allegiance, self.board, BLK_POS['queen'])
+        queen = p.Queen(allegiance, self.board, BLK_POS['queen'], self.position)
         self.add_to_board(queen, BLK_POS['queen'])
 
 
         # # King
-        king = p.King(allegiance, self.board, BLK_POS['king'])
+        king = p.King(allegiance, self.board, BLK_POS['king'], self.position)
         self.add_to_board(king, BLK_POS['king'])
 
         # Rooks
-        rook1 = p.Rook(allegiance, self.board, BLK_POS['rook'][0])
+        rook1 = p.Rook(allegiance, self.board, BLK_POS['rook'][0], self.position)
         self.add_to_board(rook1, BLK_POS['rook'][0])
 
-        rook2 = p.Rook(allegiance, self.board, BLK_POS['rook'][1])
+        rook2 = p.Rook(allegiance, self.board, BLK_POS['rook'][1], self.position)
         self.add_to_board(rook2, BLK_POS['rook'][1])
 
         # # Knight
-        knight1 = p.Knight(allegiance, self.board, BLK_POS['knight'][0])
+        knight1 = p.Knight(allegiance, self.board, BLK_POS['knight'][0], self.position)
         self.add_to_board(knight1, BLK_POS['knight'][0])
 
-        knight2 = p.Knight(allegiance, self.board, BLK_POS['knight'][1])
+        knight2 = p.Knight(allegiance, self.board, BLK_POS['knight'][1], self.position)
         self.add_to_board(knight2, BLK_POS['knight'][1])
 
         # Pawn
         for col in range(COLS):
-            pawn = p.Pawn(allegiance, self.board, [6, col])
+            pawn = p.Pawn(allegiance, self.board, [6, col], self.position)
             self.add_to_board(pawn, [6, col])
 
     def make_white_set(self):
@@ -529,38 +571,38 @@ class Board(arcade.View):
         allegiance = 'White'
 
         # Bishops
-        bishop_1 = p.Bishop(allegiance, self.board, WHT_POS['bishop'][0])
+        bishop_1 = p.Bishop(allegiance, self.board, WHT_POS['bishop'][0], self.position)
         self.add_to_board(bishop_1, WHT_POS['bishop'][0])
 
-        bishop_2 = p.Bishop(allegiance, self.board, WHT_POS['bishop'][1])
+        bishop_2 = p.Bishop(allegiance, self.board, WHT_POS['bishop'][1], self.position)
         self.add_to_board(bishop_2, WHT_POS['bishop'][1])
 
         # # Queen
-        queen = p.Queen(allegiance, self.board, WHT_POS['queen'])
+        queen = p.Queen(allegiance, self.board, WHT_POS['queen'], self.position)
         self.add_to_board(queen, WHT_POS['queen'])
 
         # King
-        king = p.King(allegiance, self.board, WHT_POS['king'])
+        king = p.King(allegiance, self.board, WHT_POS['king'], self.position)
         self.add_to_board(king, WHT_POS['king'])
 
         # Rooks
-        rook1 = p.Rook(allegiance, self.board, WHT_POS['rook'][0])
+        rook1 = p.Rook(allegiance, self.board, WHT_POS['rook'][0], self.position)
         self.add_to_board(rook1, WHT_POS['rook'][0])
 
-        rook2 = p.Rook(allegiance, self.board, WHT_POS['rook'][1])
+        rook2 = p.Rook(allegiance, self.board, WHT_POS['rook'][1], self.position)
         self.add_to_board(rook2, WHT_POS['rook'][1])
 
         #Knight
 
-        knight1 = p.Knight(allegiance, self.board, WHT_POS['knight'][0])
+        knight1 = p.Knight(allegiance, self.board, WHT_POS['knight'][0], self.position)
         self.add_to_board(knight1, WHT_POS['knight'][0])
 
-        knight2 = p.Knight(allegiance, self.board, WHT_POS['knight'][1])
+        knight2 = p.Knight(allegiance, self.board, WHT_POS['knight'][1], self.position)
         self.add_to_board(knight2, WHT_POS['knight'][1])
 
         # Pawn
         for col in range(COLS):
-            pawn = p.Pawn(allegiance, self.board, [1, col])
+            pawn = p.Pawn(allegiance, self.board, [1, col], self.position)
             self.add_to_board(pawn, [1, col])
 
     def deselect_all(self):
@@ -583,41 +625,10 @@ class Board(arcade.View):
         end_game = False
 
         piece = self.board[self.selected_row][self.selected_col]
+        move = self.find_move(self.selected_row, self.selected_col, row, col)
+        print(self.selected_piece)
 
-        x = (col * SQUARE_WIDTH) + (SCREEN_WIDTH / 3.25)
-        y = (row * SQUARE_HEIGHT) + (SCREEN_HEIGHT // 6)
-
-        """Check if castle move"""
-        castle = self.selected_piece.check_castle(row, col)
-        if castle is not None:
-            cas_row, rook_col, new_rook_col = castle
-            self.castle_triggered = True
-
-            self.selected_piece.on_click(x, y)
-
-            self.selected_piece.move([row, col])
-
-            self.castle_rook(cas_row, rook_col, new_rook_col)
-
-            self.board[self.selected_row][self.selected_col] = None
-            self.board[row][col] = piece
-
-        else:
-            self.selected_piece.on_click(x, y)
-            print(self.selected_piece)
-
-            piece.move([row, col])
-
-            """ Check if move is en passant """
-            cap = self.selected_piece.en_passant([row, col])
-            if cap is not None:
-                self.make_capture(self.board[cap[0]][cap[1]])
-                self.captured_piece = self.board[row][col]
-                self.board[cap[0]][cap[1]] = None
-
-            # Update board position
-            self.board[self.selected_row][self.selected_col] = None
-            self.board[row][col] = piece
+        self.play_move(piece, move)
 
         self.deselect_all()
 
@@ -630,16 +641,71 @@ class Board(arcade.View):
             end_game = self.check_game_over('White')
         if not end_game:
             self.switch_turn()
+        else:
+            # The game is over, so the computer has nothing left to ponder
+            self.computer.cancel()
 
-    def promote_pawn_to_queen(self, row, col):
+    def find_move(self, from_row, from_col, row, col):
         """
-            Creates a Queen object and replaces the pawn with it
+            Finds the rules-core move for moving the piece at (from_row, from_col) to (row, col).
+            Pawns reaching the last rank promote to a queen, and clicking on a rook while the
+            King is selected picks the matching castle move.
+            :return move:
+        """
+        moves = legal_moves_from(self.position, square(from_row, from_col))
+        for move in moves:
+            if to_square(move) == square(row, col):
+                return move
+
+        # Clicking on a rook while the King is selected castles on that side
+        if col in ROOK_CASTLE_COLS:
+            for move in moves:
+                if is_castle(move) and to_square(move) == square(row, ROOK_CASTLE_COLS[col]):
+                    return move
+        return None
+
+    def play_move(self, piece, move):
+        """
+            Animates a move on the sprites and plays it on the rules-core position.
+            Castling moves the rook as well and en passant captures the passed pawn.
+            :param piece: the sprite being moved
+            :param move: the rules-core move
+        """
+        from_row, from_col = from_square(move) >> 3, from_square(move) & 7
+        row, col = to_square(move) >> 3, to_square(move) & 7
+
+        x = (col * SQUARE_WIDTH) + (SCREEN_WIDTH / 3.25)
+        y = (row * SQUARE_HEIGHT) + (SCREEN_HEIGHT // 6)
+
+        piece.on_click(x, y)
+        piece.move([row, col])
+
+        """Check if castle move"""
+        if is_castle(move):
+            self.castle_triggered = True
+            rook_from, rook_to = CASTLE_ROOK_SQUARES[to_square(move)]
+            self.castle_rook(rook_from >> 3, rook_from & 7, rook_to & 7)
+
+        """ Check if move is en passant """
+        if move_flag(move) == EP_CAPTURE:
+            self.make_capture(self.board[from_row][col])
+            self.board[from_row][col] = None
+
+        # Update board position
+        self.board[from_row][from_col] = None
+        self.board[row][col] = piece
+        self.position.make_move(move)
+
+    def promote_pawn(self, row, col, kind):
+        """
+            Creates the piece the pawn promotes to and replaces the pawn with it
             :param row:
             :param col:
+            :param kind: the rules-core piece type promoted to, such as QUEEN
         """
         sound_manager.play_promote_sound()
 
-        piece = p.Queen(self.selected_piece.allegiance, self.board, [row, col])
+        piece = PROMOTION_PIECES[kind](self.board[row][col].allegiance, self.board, [row, col], self.position)
         self.board[row][col] = piece
 
     def castle_rook(self, row, col, new_col):
@@ -675,26 +741,28 @@ class Board(arcade.View):
             self.handle_computer_turn()
 
     def handle_computer_turn(self):
+        # Handle computer input for black's turn: start thinking in the background, and
+        # on_update plays the move when the search is done
+        # The sprite the computer moved last turn is done with; keep on_update from
+        # promoting it again while this search runs
+        self.computer_piece = None
+        if self.current_turn == black_allegiance:
+            self.computer.start_best_move(COMPUTER_MAX_DEPTH, clock=self.BLACK_TIME.total_seconds())
+
+    def finish_computer_turn(self):
         end_game = False
 
-        # Handle computer input for black's turn
         if self.current_turn == black_allegiance:
 
-            computer_piece, coords, computer_cap, capped_piece = self.computer.make_best_move(2)
+            computer_piece, coords, computer_cap, capped_piece = self.computer.finish_best_move()
 
             print(f"Move {computer_piece} to {coords}")
-            old_coords = [computer_piece.current_row, computer_piece.current_col]
-            self.board[old_coords[0], old_coords[1]] = None
-            self.board[coords[0], coords[1]] = computer_piece
 
             if computer_cap:
                 self.make_capture(capped_piece)
 
             self.computer_piece = computer_piece
-            x = (coords[1] * SQUARE_WIDTH) + (SCREEN_WIDTH / 3.25)
-            y = (coords[0] * SQUARE_HEIGHT) + (SCREEN_HEIGHT // 6)
-
-            self.computer_piece.on_click(x, y)
+            self.play_move(computer_piece, self.computer.chosen_move)
 
             print("============= Blacks Turn ============")
             self.print_board()
@@ -707,6 +775,10 @@ class Board(arcade.View):
                 end_game = self.check_game_over('White')
             if not end_game:
                 self.switch_turn()
+                # Think about the expected reply while the player decides; move_piece leads
+                # to start_best_move, which keeps this search on a hit
+                if COMPUTER_PONDER:
+                    self.computer.start_pondering(COMPUTER_MAX_DEPTH)
 
     def make_capture(self, piece):
         # allegiance = piece.allegiance
@@ -737,39 +809,13 @@ class Board(arcade.View):
     # This will end the game and declare a winner
     def check_game_over(self, allegiance):
         end_game = False
-        # get all the pieces of a specific allegiance
-        pieces = []
-        # for each square
-        for row in range(ROWS):
-            for col in range(COLS):
-                # if the square has a piece
-                if isinstance(self.board[row][col], p.Piece):
-                    # if that piece is of the correct allegiance, save it
-                    if self.board[row][col].allegiance == allegiance:
-                        pieces.append(self.board[row][col])
-
-        king_in_check = False
-        for i in pieces:
-            # if that piece is the king, check if it is in check
-            if isinstance(i, p.King):
-                king_in_check = i.under_attack(i.current_row, i.current_col)
-
-        all_moves = []
-        for i in pieces:
-            moves, caps, attacks = i.available_moves(False)
-            # record if each piece has any moves available
-            for j in moves:
-                all_moves.append(j)
-
-            for k in caps:
-                all_moves.append(k)
-
-        # print('MOVES: ', all_moves)
-        print('CHECK: ', king_in_check)
+        result = game_result(self.position)
+
+        print('CHECK: ', is_in_check(self.position))
 
         # if there are no possible moves and the king is in check
-        if all_moves == [] and king_in_check:
-            if pieces[0].allegiance == 'White':
+        if result == CHECKMATE:
+            if allegiance == 'White':
                 win_menu = w.WinLoseMenu(theme_manager, "black", game_manager)
                 self.manager.add(win_menu)
                 end_game = True
@@ -777,7 +823,7 @@ class Board(arcade.View):
                 win_menu = w.WinLoseMenu(theme_manager, "white", game_manager)
                 self.manager.add(win_menu)
                 end_game = True
-        elif all_moves == [] and not king_in_check:
+        elif result == STALEMATE:
             win_menu = w.WinLoseMenu(theme_manager, "draw", game_manager)
             self.manager.add(win_menu)
             end_game = True
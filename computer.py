@@ -2,267 +2,189 @@
 Chess AI Logic
 """
 
-import random
-from pieces import Piece
+from engine.constants import color_of
+from engine.movegen import legal_moves
+from engine.moves import from_square, to_square, is_capture
+from engine.parallel import ParallelSearcher
+from engine.search import Searcher
+from engine.timeman import allocate_time
+from engine.worker import EngineWorker
 
-from copy import copy
-import arcade
-from sound_manager import ManageSound
-
-# Get screen dimensions
-SCREEN_WIDTH, SCREEN_HEIGHT = arcade.get_display_size()
-
-# Set dimensions for the chessboard
-BOARD_WIDTH = 800
-BOARD_HEIGHT = 600
-
-# Calculate square dimensions based on board size
-SQUARE_WIDTH = (BOARD_WIDTH - 200) // 8
-SQUARE_HEIGHT = BOARD_HEIGHT // 8
 
 class Computer:
-    def __init__(self, allegiance: str, board):
+    def __init__(self, allegiance: str, board, position, hash_mb=16, seed=None, threads=1, service=None):
         """
         Initialize the Computer object.
 
         Parameters:
         - allegiance (str): The allegiance of the computer player ("White" or "Black").
-        - board: The game board representing the current game state.
+        - board: The array of Piece sprites shown on screen.
+        - position (Position): The rules-core position the board is displaying.
+        - hash_mb (float): Memory budget for the transposition table in megabytes.
+        - seed (int): Seed for breaking ties between equal moves, None for a random game.
+        - threads (int): Processes to search with. More than 1 runs a Lazy SMP search with
+          helper processes sharing the transposition table.
+        - service (EngineService): A service to send searches to instead of searching in
+          this process, or None. The computer does not ponder when it uses one.
         """
         self.board_array = board
+        self.position = position
+        if threads > 1:
+            self.searcher = ParallelSearcher(hash_mb, seed, workers=threads)
+        else:
+            self.searcher = Searcher(hash_mb, seed)
+        self.worker = EngineWorker(self.searcher)
+        self.service = service
+        self.job = None
+        # Search of the reply the computer expects, run while the opponent thinks
+        self.ponder_job = None
+        self.ponder_key = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
 
         self.allegiance = allegiance
-        self.demo_board = copy(board)
-        self.sound_manager = ManageSound(1)
-        # self.make_demo_board()
+        self.color = color_of(allegiance)
+        self.chosen_move = None
+        self.last_result = None
 
-    # computer player will select a piece; returns a piece object
-    def select_piece(self):
+    def make_best_move(self, depth, time_limit=None, clock=None):
         """
-        Select a piece to move.
+        Make the best move based on evaluation depth.
+
+        Parameters:
+        - depth (int): Deepest iteration of the search.
+        - time_limit (float): Seconds the search may take, or None to always reach depth.
+        - clock (float): Seconds left on the computer's clock. When given, the time manager
+          budgets the move from it instead of using time_limit.
 
         Returns:
-        - available_pieces (list): List of available pieces for the computer player to move.
+        - piece (Piece): The piece selected for the best move.
+        - move (list): Coordinates of the best move.
+        - is_cap (bool): Whether the move results in a capture.
+        - capped_piece (Piece): The piece captured (if any).
         """
-        available_pieces = []
-        # for each square in the array representing the board
-        for row in self.board_array:
-            for square in row:
-                # if it has a piece
-                if square is not None:
-                    # check if the piece is of the correct color
-                    if square.allegiance == self.allegiance:
-                        available_pieces.append(square)
+        time_limit, soft_limit = self.time_budget(time_limit, clock)
+        if self.service is not None:
+            job = self.service.submit(id(self), self.position, depth, time_limit, soft_limit=soft_limit)
+            return self.use_result(job.result())
+        # The searcher is not thread-safe, so a ponder search still running on it must stop first
+        self.worker.stop()
+        self.ponder_job = None
+        return self.use_result(self.searcher.search(self.position, depth, time_limit, soft_limit=soft_limit))
 
-        return available_pieces
-
-    def temp_select_piece(self, allegiance):
+    def start_best_move(self, depth, time_limit=None, clock=None):
         """
-        Temporary selection of pieces for simulation.
+        Start searching for the best move on a background thread and return at once.
+        Poll the returned job's done() and then call finish_best_move().
 
         Parameters:
-        - allegiance (str): The allegiance of the pieces to select ("White" or "Black").
+        - depth (int): Deepest iteration of the search.
+        - time_limit (float): Seconds the search may take, or None to always reach depth.
+        - clock (float): Seconds left on the computer's clock. When given, the time manager
+          budgets the move from it instead of using time_limit.
 
         Returns:
-        - available_pieces (list): List of available pieces for simulation.
-        """
-        available_pieces = []
-        # for each square in the array representing the board
-        for row in self.demo_board:
-            for square in row:
-                # if it has a piece
-                if square is not None:
-                    # check if the piece is of the correct color
-                    if square.allegiance == allegiance:
-                        available_pieces.append(square)
-
-        return available_pieces
-
-    def template_move_piece(self, piece: Piece, move_coords):
-        """
-        Simulate moving a piece for evaluation.
+        - job (SearchJob): The running search, or a ServiceJob when using a service.
+        """
+        time_limit, soft_limit = self.time_budget(time_limit, clock)
+        if self.service is not None:
+            self.job = self.service.submit(id(self), self.position, depth, time_limit, soft_limit=soft_limit)
+            return self.job
+        ponder_job = self.ponder_job
+        self.ponder_job = None
+        if ponder_job is not None:
+            if self.position.key == self.ponder_key and not ponder_job.cancelled:
+                # Ponder hit: the search already running is on this position, so keep it
+                self.ponder_hits += 1
+                ponder_job.ponderhit(time_limit, soft_limit)
+                self.job = ponder_job
+                return self.job
+            self.ponder_misses += 1
+        # Starting a search cancels a ponder search on the wrong position
+        self.job = self.worker.start_search(self.position, depth, time_limit, soft_limit=soft_limit)
+        return self.job
+
+    def start_pondering(self, depth):
+        """
+        Search the reply the last search expected, on the opponent's time. Call this after
+        the computer's move has been played on the position; start_best_move then picks
+        the ponder search up if the opponent plays the expected reply, or replaces it.
 
         Parameters:
-        - piece (Piece): The piece object to simulate moving.
-        - move_coords (list): Coordinates of the simulated move.
+        - depth (int): Deepest iteration of the ponder search.
 
         Returns:
-        - None
+        - job (SearchJob): The ponder search, or None if there is no expected reply or the
+          computer uses a service, whose workers are shared with other games.
         """
+        pv = self.last_result.pv if self.last_result is not None else []
+        if self.service is not None or len(pv) < 2 or pv[1] not in legal_moves(self.position):
+            return None
+        ponder_position = self.position.copy()
+        ponder_position.make_move(pv[1])
+        self.ponder_key = ponder_position.key
+        self.ponder_job = self.worker.start_search(ponder_position, depth)
+        return self.ponder_job
 
-        # Store the piece's current position
-        current_row = piece.temp_current_row
-        current_col = piece.temp_current_col
-
-        # Move piece to square
-        self.demo_board = piece.template_move(move_coords, self.demo_board)
-
-        # Update the piece's position in the board_array
-        self.demo_board[current_row][current_col] = None
-        self.demo_board[move_coords[0]][move_coords[1]] = piece
-
-    def evaluate(self, depth):
+    def time_budget(self, time_limit, clock):
         """
-        Evaluate possible moves based on a given depth.
+        Work out the hard and soft time limits for a search.
 
         Parameters:
-        - depth (int): The depth of evaluation for the minimax algorithm.
+        - time_limit (float): A fixed limit, used when clock is None.
+        - clock (float): Seconds left on the computer's clock, or None.
 
         Returns:
-        - best_move (list): List of the best moves determined by evaluation.
+        - hard (float): Seconds after which the search stops, or None.
+        - soft (float): Seconds the search should normally take, or None.
         """
-        best_move = []
-        max_score = float('-inf')
-
-        available_pieces = self.select_piece()
-        for piece in available_pieces:
-            possible_moves, possible_captures, attacks = piece.available_moves(False)
-            for new_position in possible_moves + possible_captures:
-
-                # Simulate the move
-                score = self.minimax(depth - 1, False, piece, new_position)  # Opponent's turn
+        if clock is None:
+            return time_limit, None
+        soft, hard = allocate_time(self.position, clock)
+        return hard, soft
 
-                # Add computer position evaluation !!!
-                target_piece = self.demo_board[new_position[0]][new_position[1]]
-                position_value = target_piece.get_value() if target_piece is not None else 0
-                evaluation_board = 0
-                if target_piece is not None:
-                    if target_piece.allegiance == "White":
-                        evaluation_board = target_piece.eval[new_position[0]][new_position[1]]
-                    else:
-                        evaluation_board = reversed(target_piece.eval)[new_position[0]][new_position[1]]
-
-                score += position_value + evaluation_board
-
-                # Computer should do the move that will get the player the LEAST amount of points
-                # Currently it's doing moves that will get player the most points <-- aka bad? i think??
-                if score > max_score:
-                    max_score = score
-                    # New Low Min-Score, so reset the list of best moves
-                    best_move = []
-                    best_move.append((piece, new_position))
-                elif score == max_score:
-                    # Add additional best-move to list
-                    best_move.append((piece, new_position))
-
-        return best_move
-
-    def get_best(self, moves):
+    def finish_best_move(self):
         """
-        Get the best move from a list of moves.
-
-        Parameters:
-        - moves (list): List of moves to evaluate.
+        Collect the result of the search started by start_best_move.
 
         Returns:
-        - best_move (tuple): Tuple containing the best move and its piece.
+        - The same values as make_best_move.
         """
-        max_points = float('-inf')
-        best_move = None
+        job = self.job
+        self.job = None
+        return self.use_result(job.result())
 
-        for move in moves:
-            piece, position = move
-            target_piece = self.board_array[position[0], position[1]]
-            if target_piece is not None:
-                score = target_piece.get_value()
-                if score > max_points:
-                    max_points = score
-                    best_move = (piece, position)
-            else:
-                if max_points < 0:
-                    max_points = 0
+    def cancel(self):
+        """Stop any background search, pondering included, without using its result."""
+        if self.service is not None:
+            self.service.cancel_game(id(self))
+        self.worker.stop()
+        self.job = None
+        self.ponder_job = None
 
-        if max_points == 0:
-            selection = random.randrange(0, len(moves))
-            best_move = moves[selection]
-
-        return best_move
-
-    def make_best_move(self, depth):
+    def use_result(self, result):
         """
-        Make the best move based on evaluation depth.
+        Turn a search result into the sprites the Board needs to play it.
 
         Parameters:
-        - depth (int): Depth of evaluation for the best move.
+        - result (SearchResult): The finished search.
 
         Returns:
-        - piece (Piece): The piece selected for the best move.
-        - move (list): Coordinates of the best move.
-        - is_cap (bool): Whether the move results in a capture.
-        - capped_piece (Piece): The piece captured (if any).
+        - The same values as make_best_move.
         """
         is_cap = False
         capped_piece = None
-        self.demo_board = copy(self.board_array)
-        best_moves = self.evaluate(depth)
 
-        piece, move = self.get_best(best_moves)
+        self.last_result = result
+        self.chosen_move = self.last_result.best_move
+        start = from_square(self.chosen_move)
+        target = to_square(self.chosen_move)
 
-        if self.board_array[move[0]][move[1]] != self.allegiance and self.board_array[move[0]][move[1]] is not None:
+        piece = self.board_array[start >> 3][start & 7]
+        move = (target >> 3, target & 7)
+
+        if is_capture(self.chosen_move) and self.board_array[move[0]][move[1]] is not None:
             is_cap = True
             capped_piece = self.board_array[move[0]][move[1]]
 
         return piece, move, is_cap, capped_piece
-
-    def minimax(self, depth, is_maximizing_player, curr_piece, position):
-        """
-        Minimax algorithm for evaluating moves.
-
-        Parameters:
-        - depth (int): Depth of evaluation for the minimax algorithm.
-        - is_maximizing_player (bool): Flag indicating if the player is maximizing the score.
-        - curr_piece (Piece): Current piece being evaluated.
-        - position (list): Coordinates of the move.
-
-        Returns:
-        - eval (int): Evaluation score for the move.
-        """
-        if depth == 0:
-
-            # Evaluate the position
-            target_piece = self.demo_board[position[0]][position[1]]
-            position_value = target_piece.get_value() if target_piece is not None else 0
-            if curr_piece.allegiance == "White":
-                evaluation_board = curr_piece.eval[position[0]][position[1]]
-            else:
-                evaluation_board = reversed(curr_piece.eval)[position[0]][position[1]]
-            return position_value + evaluation_board
-
-        if is_maximizing_player:
-            # Computer's Turn
-            max_eval = float('-inf')
-            best_move = None
-            available_pieces = self.temp_select_piece("Black")
-            for piece in available_pieces:
-                possible_moves, possible_captures, attacks = piece.available_moves(False)
-                for new_position in possible_moves + possible_captures:
-
-                    eval = self.minimax(depth - 1, False, piece, new_position)  # Opponent's turn
-
-                    if eval < max_eval:
-                        max_eval = eval
-                        best_move = (piece, new_position)
-
-            if best_move:
-                self.template_move_piece(best_move[0], best_move[1])
-            return max_eval
-        else:
-            # Human's Turn
-            min_eval = float('inf')
-            best_move = None
-            available_pieces = self.temp_select_piece("White")
-            for piece in available_pieces:
-                possible_moves, possible_captures, attacks = piece.available_moves(False)
-
-                for move in possible_moves + possible_captures:
-
-                    eval = self.minimax(depth - 1, True, piece, move)  # Computer's turn
-
-                    if eval < min_eval:
-                        min_eval = eval
-                        best_move = (piece, move)
-
-            if best_move:
-                self.template_move_piece(best_move[0], best_move[1])
-
-            return min_eval
\ No newline at end of file
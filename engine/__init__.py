@@ -0,0 +1,11 @@
+"""
+Headless chess rules core.
+
+Nothing in this package imports arcade, so positions, move generation, the
+computer player's search and game-over detection can all run without a
+display. The Board and Piece sprites are a view layer on top of it.
+"""
+
+from engine.constants import WHITE, BLACK, START_FEN
+from engine.position import Position
+from engine.movegen import legal_moves, legal_moves_from, is_in_check, game_result, CHECKMATE, STALEMATE
@@ -0,0 +1,167 @@
+"""
+Deterministic search benchmark.
+
+Searches a fixed suite of positions to a fixed depth with a fresh, seeded
+Searcher for each, so two runs of the same code search exactly the same
+tree. The total node count and a signature over every position's best move,
+score and node count only change when search behaviour changes; the time
+and nodes/second show whether a change made the search faster.
+
+With --threads the suite is searched by a ParallelSearcher instead. Helper
+processes make the tree depend on timing, so the signature is no longer
+reproducible, but the time to reach the depth shows the parallel speedup;
+--speedup runs the suite with 1, 2, ... N processes and prints the curve.
+
+    python -m engine.bench
+    python -m engine.bench --depth 5 --verbose
+    python -m engine.bench --speedup 4
+    python -m engine.bench --depth 5 --disable null_move lmr
+"""
+
+import argparse
+import time
+import zlib
+
+from engine.constants import START_FEN
+from engine.moves import to_uci
+from engine.parallel import ParallelSearcher
+from engine.position import Position
+from engine.search import Searcher, SEARCH_FEATURES
+
+BENCH_DEPTH = 4
+BENCH_SEED = 3050
+BENCH_HASH_MB = 16
+
+BENCH_POSITIONS = (
+    START_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8",
+    "r2q1rk1/ppp2ppp/2np1n2/2b1p1B1/2B1P1b1/2NP1N2/PPP2PPP/R2Q1RK1 w - - 0 8",
+    "8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+)
+
+
+def bench(depth=BENCH_DEPTH, seed=BENCH_SEED, hash_mb=BENCH_HASH_MB, positions=BENCH_POSITIONS, threads=1,
+          options=None):
+    """
+    Search every bench position to a fixed depth.
+
+    Parameters:
+    - depth (int): Depth to search each position to.
+    - seed (int): Seed for the searcher's tie-breaking.
+    - hash_mb (float): Transposition table size in megabytes.
+    - positions (tuple): FEN strings to search.
+    - threads (int): Processes to search with. With more than 1 a single ParallelSearcher
+      searches every position, starting a new game for each, and its helpers are started
+      before the timing begins.
+    - options (dict): Searcher switches to search with, such as {"null_move": False}.
+
+    Returns:
+    - results (list): (fen, SearchResult, Searcher.stats()) for each position.
+    - nodes (int): Total nodes searched.
+    - elapsed (float): Total seconds spent searching.
+    - signature (int): CRC-32 of every position's best move, score and node count.
+    """
+    results = []
+    nodes = 0
+    elapsed = 0.0
+    signature = 0
+    options = options or {}
+    parallel = ParallelSearcher(hash_mb, seed, workers=threads, **options) if threads > 1 else None
+    try:
+        if parallel is not None:
+            # Start the helpers and let them finish importing before anything is timed
+            parallel.search(Position(positions[0]), 1)
+        for fen in positions:
+            if parallel is not None:
+                searcher = parallel
+                searcher.new_game()
+                searcher.rng.seed(seed)
+            else:
+                searcher = Searcher(hash_mb, seed, **options)
+            result = searcher.search(Position(fen), depth)
+            results.append((fen, result, searcher.stats()))
+            nodes += result.nodes
+            elapsed += result.elapsed
+            record = f"{to_uci(result.best_move) if result.best_move else '-'} {result.score} {result.nodes};"
+            signature = zlib.crc32(record.encode(), signature)
+    finally:
+        if parallel is not None:
+            parallel.close()
+    return results, nodes, elapsed, signature
+
+
+def speedup_curve(max_threads, depth=BENCH_DEPTH, hash_mb=BENCH_HASH_MB, positions=BENCH_POSITIONS):
+    """
+    Time the bench with 1 up to max_threads processes.
+
+    Parameters:
+    - max_threads (int): Most processes to search with.
+    - depth (int): Depth to search each position to.
+    - hash_mb (float): Transposition table size in megabytes.
+    - positions (tuple): FEN strings to search.
+
+    Returns:
+    - list: (threads, nodes, elapsed, speedup) for each number of processes, where speedup
+      is the time with one process divided by the time with this many.
+    """
+    curve = []
+    for threads in range(1, max_threads + 1):
+        _, nodes, elapsed, _ = bench(depth, hash_mb=hash_mb, positions=positions, threads=threads)
+        base = curve[0][2] if curve else elapsed
+        curve.append((threads, nodes, elapsed, base / elapsed if elapsed > 0 else 0.0))
+    return curve
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search a fixed suite of positions and print a node-count signature.")
+    parser.add_argument("--depth", type=int, default=BENCH_DEPTH, help=f"search depth (default: {BENCH_DEPTH})")
+    parser.add_argument("--hash", type=float, default=BENCH_HASH_MB,
+                        help=f"transposition table size in MB (default: {BENCH_HASH_MB})")
+    parser.add_argument("--verbose", action="store_true", help="print the result for every position")
+    parser.add_argument("--threads", type=int, default=1, help="processes to search with (default: 1)")
+    parser.add_argument("--speedup", type=int, metavar="N",
+                        help="print the time to depth with 1 to N processes instead")
+    parser.add_argument("--disable", nargs="+", default=[], choices=SEARCH_FEATURES, metavar="FEATURE",
+                        help=f"search techniques to switch off: {', '.join(SEARCH_FEATURES)}")
+    args = parser.parse_args(argv)
+    options = {feature: False for feature in args.disable}
+
+    if args.speedup:
+        print("threads     nodes      time  speedup")
+        for threads, nodes, elapsed, speedup in speedup_curve(args.speedup, args.depth, args.hash):
+            print(f"{threads:7} {nodes:9} {elapsed:8.3f}s {speedup:7.2f}x")
+        return 0
+
+    start = time.perf_counter()
+    results, nodes, elapsed, signature = bench(args.depth, hash_mb=args.hash, threads=args.threads,
+                                               options=options)
+    if args.verbose:
+        for fen, result, _ in results:
+            move = to_uci(result.best_move) if result.best_move else "-"
+            print(f"{move:6} {result.score:>9} {result.nodes:>9} {result.elapsed:7.2f}s  {fen}")
+        print()
+    print(f"nodes     {nodes}")
+    print(f"time      {elapsed:.3f}s (wall {time.perf_counter() - start:.3f}s)")
+    print(f"nps       {int(nodes / elapsed) if elapsed > 0 else 0}")
+    print(f"signature {signature}")
+    totals = {name: sum(stats[name] for _, _, stats in results)
+              for name in ("pvs_re_searches", "re_searches", "aspiration_fail_lows", "aspiration_fail_highs")}
+    print(f"re-search pvs {totals['pvs_re_searches']}  lmr {totals['re_searches']}  aspiration "
+          f"{totals['aspiration_fail_lows']} low / {totals['aspiration_fail_highs']} high")
+    for cache, label in (("eval_cache", "eval cache"), ("pawn_table", "pawn table")):
+        counts = [stats["evaluation"][cache] for _, _, stats in results if stats["evaluation"][cache]]
+        if counts:
+            probes = sum(count["probes"] for count in counts)
+            hits = sum(count["hits"] for count in counts)
+            print(f"{label} {hits}/{probes} hits ({hits / probes if probes else 0:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
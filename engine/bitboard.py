@@ -0,0 +1,180 @@
+"""
+Bitboard helpers.
+
+A bitboard is an int whose bit n is set when square n is in the set. Attack
+sets are computed for whole bitboards at once with shifts and masks, so a
+query such as "which squares do these knights attack" is a handful of bitwise
+operations rather than a walk over the board.
+
+Attacks of a single piece are read from tables built once at import: the
+knight, king and pawn attacks of every square, the ray leaving every square
+in each of the eight directions, and the squares between and through every
+pair of aligned squares. The ray functions here cut each ray at its first
+blocker; the move generator uses the magic-bitboard lookups in engine.magic,
+which are built from them.
+"""
+
+FULL = (1 << 64) - 1
+
+FILE_A = 0x0101010101010101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_2 = RANK_1 << 8
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_7 = RANK_1 << 48
+RANK_8 = RANK_1 << 56
+
+NOT_A = FULL ^ FILE_A
+NOT_H = FULL ^ FILE_H
+NOT_AB = FULL ^ (FILE_A | FILE_B)
+NOT_GH = FULL ^ (FILE_G | FILE_H)
+
+# (shift, wrap mask) for each sliding direction; a negative shift moves towards square 0
+NORTH = (8, FULL)
+SOUTH = (-8, FULL)
+EAST = (1, NOT_A)
+WEST = (-1, NOT_H)
+NORTH_EAST = (9, NOT_A)
+NORTH_WEST = (7, NOT_H)
+SOUTH_EAST = (-7, NOT_A)
+SOUTH_WEST = (-9, NOT_H)
+
+# Indices into RAYS and RAY_SQUARES; direction ^ 1 is the opposite direction
+DIRECTIONS = (NORTH, SOUTH, EAST, WEST, NORTH_EAST, SOUTH_WEST, NORTH_WEST, SOUTH_EAST)
+# Rays running towards higher squares are cut at their lowest blocker, the others at their highest
+ROOK_RAYS_UP = (0, 2)
+ROOK_RAYS_DOWN = (1, 3)
+BISHOP_RAYS_UP = (4, 6)
+BISHOP_RAYS_DOWN = (5, 7)
+
+
+def lsb(bb):
+    """Return the index of the lowest set square of a non-empty bitboard."""
+    return (bb & -bb).bit_length() - 1
+
+
+def iter_squares(bb):
+    """
+    Iterate over the squares of a bitboard from lowest to highest.
+
+    Parameters:
+    - bb (int): The bitboard.
+
+    Yields:
+    - int: Each square index in the set.
+    """
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def shift(bb, direction):
+    """Shift every square of a bitboard one step in a direction, dropping squares that wrap."""
+    amount, mask = direction
+    if amount > 0:
+        return (bb << amount) & mask & FULL
+    return (bb >> -amount) & mask
+
+
+def knight_attacks_bb(knights):
+    """Return every square attacked by a set of knights."""
+    l1 = (knights >> 1) & NOT_H
+    l2 = (knights >> 2) & NOT_GH
+    r1 = (knights << 1) & NOT_A
+    r2 = (knights << 2) & NOT_AB
+    h1 = l1 | r1
+    h2 = l2 | r2
+    return ((h1 << 16) | (h1 >> 16) | (h2 << 8) | (h2 >> 8)) & FULL
+
+
+def king_attacks_bb(kings):
+    """Return every square attacked by a set of kings."""
+    row = kings | ((kings << 1) & NOT_A) | ((kings >> 1) & NOT_H)
+    return (row | (row << 8) | (row >> 8)) & FULL & ~kings
+
+
+def pawn_attacks_bb(pawns, color):
+    """Return every square attacked by a set of pawns of the given color (0 white, 1 black)."""
+    if color == 0:
+        return (((pawns << 9) & NOT_A) | ((pawns << 7) & NOT_H)) & FULL
+    return ((pawns >> 7) & NOT_A) | ((pawns >> 9) & NOT_H)
+
+
+def _ray_squares(sq, direction):
+    squares = []
+    current = shift(1 << sq, direction)
+    while current:
+        squares.append(lsb(current))
+        current = shift(current, direction)
+    return tuple(squares)
+
+
+# RAY_SQUARES[direction][sq]: the squares leaving sq in a direction, nearest first
+RAY_SQUARES = tuple(tuple(_ray_squares(sq, direction) for sq in range(64)) for direction in DIRECTIONS)
+# RAYS[direction][sq]: the same squares as a bitboard
+RAYS = tuple(tuple(sum(1 << target for target in squares) for squares in rays) for rays in RAY_SQUARES)
+
+KNIGHT_ATTACKS = tuple(knight_attacks_bb(1 << sq) for sq in range(64))
+KING_ATTACKS = tuple(king_attacks_bb(1 << sq) for sq in range(64))
+# PAWN_ATTACKS[color][sq]
+PAWN_ATTACKS = (tuple(pawn_attacks_bb(1 << sq, 0) for sq in range(64)),
+                tuple(pawn_attacks_bb(1 << sq, 1) for sq in range(64)))
+
+
+def _pair_tables():
+    between_table = [0] * 4096
+    line_table = [0] * 4096
+    for a in range(64):
+        for direction in range(8):
+            full_line = RAYS[direction][a] | RAYS[direction ^ 1][a] | (1 << a)
+            passed = 0
+            for b in RAY_SQUARES[direction][a]:
+                between_table[a << 6 | b] = passed
+                line_table[a << 6 | b] = full_line
+                passed |= 1 << b
+    return tuple(between_table), tuple(line_table)
+
+
+# Indexed by a * 64 + b; zero when the squares are not on a shared rank, file or diagonal
+BETWEEN, LINE = _pair_tables()
+
+
+def rook_attacks_rays(sq, occupied):
+    """Return the squares a rook on sq attacks given the occupancy, by walking its rays."""
+    attacks = 0
+    for direction in ROOK_RAYS_UP:
+        ray = RAYS[direction]
+        attacks |= ray[sq]
+        blockers = ray[sq] & occupied
+        if blockers:
+            attacks ^= ray[(blockers & -blockers).bit_length() - 1]
+    for direction in ROOK_RAYS_DOWN:
+        ray = RAYS[direction]
+        attacks |= ray[sq]
+        blockers = ray[sq] & occupied
+        if blockers:
+            attacks ^= ray[blockers.bit_length() - 1]
+    return attacks
+
+
+def bishop_attacks_rays(sq, occupied):
+    """Return the squares a bishop on sq attacks given the occupancy, by walking its rays."""
+    attacks = 0
+    for direction in BISHOP_RAYS_UP:
+        ray = RAYS[direction]
+        attacks |= ray[sq]
+        blockers = ray[sq] & occupied
+        if blockers:
+            attacks ^= ray[(blockers & -blockers).bit_length() - 1]
+    for direction in BISHOP_RAYS_DOWN:
+        ray = RAYS[direction]
+        attacks |= ray[sq]
+        blockers = ray[sq] & occupied
+        if blockers:
+            attacks ^= ray[blockers.bit_length() - 1]
+    return attacks
+
@@ -0,0 +1,144 @@
+"""
+Consistency check for the state the position keeps up to date incrementally.
+
+Perft proves the move counts right, but not the state the search reads
+without recomputing it. This plays random games from the perft reference
+positions and, after every move played and every move taken back, compares
+each piece of incremental state with a rebuild from scratch: the Zobrist and
+pawn keys, the material and piece-square sums (and evaluate() against
+evaluate_full()), the bitboards and the cached attack maps. It also checks
+that legal_moves() gives exactly the moves of the plain generator that plays
+each pseudo-legal move and tests the king.
+
+    python -m engine.consistency
+    python -m engine.consistency --games 50 --plies 120 --seed 7
+"""
+
+import argparse
+import math
+import random
+
+from engine.evaluation import evaluate, evaluate_full
+from engine.movegen import legal_moves, pseudo_legal_moves, is_legal, attack_map
+from engine.moves import to_uci
+from engine.perft import REFERENCE_POSITIONS
+from engine.position import Position
+from engine.zobrist import compute_key, compute_pawn_key
+
+
+def check_position(pos):
+    """
+    Compare a position's incremental state with a rebuild from scratch.
+
+    Parameters:
+    - pos (Position): The position to check. Its cached attack maps are checked before
+      the move generation checks fill them in.
+
+    Returns:
+    - list: A description of every mismatch found, empty when there is none.
+    """
+    problems = []
+    rebuilt = Position(pos.fen())
+    if pos.key != compute_key(pos):
+        problems.append("key")
+    if pos.pawn_key != compute_pawn_key(pos):
+        problems.append("pawn key")
+    if pos.bitboards != rebuilt.bitboards or pos.occupied != rebuilt.occupied:
+        problems.append("bitboards")
+    if pos.king_square != rebuilt.king_square:
+        problems.append("king squares")
+    if pos.material != rebuilt.material:
+        problems.append("material")
+    if not math.isclose(pos.psq, rebuilt.psq, abs_tol=1e-9):
+        problems.append("piece-square sum")
+    if not math.isclose(evaluate(pos), evaluate_full(pos), abs_tol=1e-9):
+        problems.append("evaluate() against evaluate_full()")
+    for color in (0, 1):
+        attacked = pos.attack_maps[color]
+        if attacked is not None and attacked != attack_map(pos, color):
+            problems.append(f"attack map of color {color}")
+
+    generated = sorted(legal_moves(pos))
+    filtered = sorted(move for move in pseudo_legal_moves(pos) if is_legal(pos, move))
+    if generated != filtered:
+        missing = [to_uci(move) for move in filtered if move not in generated]
+        extra = [to_uci(move) for move in generated if move not in filtered]
+        problems.append(f"legal moves (missing {missing}, extra {extra})")
+    return problems
+
+
+def check_game(fen, plies, rng):
+    """
+    Play a random game from a position, then take every move back, checking the
+    position after each step.
+
+    Parameters:
+    - fen (str): The starting position.
+    - plies (int): The most moves to play.
+    - rng (random.Random): Picks the moves.
+
+    Returns:
+    - list: (moves played, problem) for every mismatch, the moves in UCI notation.
+    """
+    pos = Position(fen)
+    start_key = pos.key
+    played = []
+    failures = []
+
+    def check():
+        failures.extend((" ".join(played), problem) for problem in check_position(pos))
+
+    check()
+    for _ in range(plies):
+        moves = legal_moves(pos)
+        if not moves or pos.is_draw():
+            break
+        move = rng.choice(moves)
+        pos.make_move(move)
+        played.append(to_uci(move))
+        check()
+    while played:
+        pos.unmake_move()
+        played.pop()
+        check()
+    if pos.fen() != Position(fen).fen() or pos.key != start_key:
+        failures.append(("", "taking every move back did not restore the start"))
+    return failures
+
+
+def check_games(games=20, plies=80, seed=0):
+    """
+    Run check_game from each of the perft reference positions in turn.
+
+    Parameters:
+    - games (int): Number of games to play.
+    - plies (int): The most moves to play in each game.
+    - seed (int): Seed for the move choices, so a failure can be replayed.
+
+    Returns:
+    - list: (position name, moves played, problem) for every mismatch.
+    """
+    rng = random.Random(seed)
+    failures = []
+    for game in range(games):
+        name, fen, _ = REFERENCE_POSITIONS[game % len(REFERENCE_POSITIONS)]
+        failures.extend((name, moves, problem) for moves, problem in check_game(fen, plies, rng))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the position's incremental state on random games.")
+    parser.add_argument("--games", type=int, default=20, help="random games to play (default: 20)")
+    parser.add_argument("--plies", type=int, default=80, help="most moves per game (default: 80)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the move choices (default: 0)")
+    args = parser.parse_args(argv)
+
+    failures = check_games(args.games, args.plies, args.seed)
+    for name, moves, problem in failures:
+        print(f"FAIL {name:12} {problem} after: {moves}")
+    print("all positions consistent" if not failures else f"{len(failures)} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+"""
+Shared constants for the rules core: colors, piece codes and piece values.
+
+A piece is stored as a single int: the low three bits hold the piece type and
+bit 3 holds the color, so white pieces are 1-6 and black pieces are 9-14.
+Squares are numbered row * 8 + col, with row 0 being White's back rank, which
+matches the (row, col) indexing used by the Board view.
+"""
+
+WHITE = 0
+BLACK = 1
+
+EMPTY = 0
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+
+PIECE_TYPES = (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)
+
+# Material values, the same numbers the Piece sprites use
+PIECE_VALUES = (0, 10, 32, 33, 50, 90, 900)
+
+# Castling right bits
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+# Deepest ply the search can reach, including extensions
+MAX_PLY = 128
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+FEN_PIECES = {
+    "P": PAWN, "N": KNIGHT, "B": BISHOP, "R": ROOK, "Q": QUEEN, "K": KING,
+}
+
+
+def make_piece(color, piece_type):
+    """
+    Build a piece code from a color and a piece type.
+
+    Parameters:
+    - color (int): WHITE or BLACK.
+    - piece_type (int): One of PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING.
+
+    Returns:
+    - int: The piece code.
+    """
+    return piece_type | (color << 3)
+
+
+def piece_color(piece):
+    """Return the color of a (non-empty) piece code."""
+    return piece >> 3
+
+
+def piece_type(piece):
+    """Return the piece type of a piece code."""
+    return piece & 7
+
+
+def color_of(allegiance):
+    """Convert a view allegiance string ("White"/"Black") into a color."""
+    return WHITE if allegiance == "White" else BLACK
+
+
+def square(row, col):
+    """Return the square index for a (row, col) pair."""
+    return row * 8 + col
+
+
+def square_name(sq):
+    """Return the algebraic name of a square, e.g. 0 -> 'a1'."""
+    return "abcdefgh"[sq & 7] + str((sq >> 3) + 1)
+
+
+def parse_square(name):
+    """Return the square index for an algebraic square name, e.g. 'e4' -> 28."""
+    return (int(name[1]) - 1) * 8 + "abcdefgh".index(name[0])
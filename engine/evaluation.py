@@ -0,0 +1,378 @@
+"""
+Static evaluation for the computer player.
+
+Scores are given from White's point of view: material plus a piece-square
+bonus for where each piece stands. The tables are written from White's side
+of the board, so the first row is White's eighth rank.
+
+The tables are flattened once at import into PSQ_TABLES, one 64 entry array
+per piece code already mirrored and signed for its color, and PIECE_MATERIAL
+gives each piece code's value. The Position adds and subtracts these as
+pieces are put down and picked up, so evaluate() only reads two sums.
+
+The search scores leaves with an Evaluator, which adds pawn structure
+(doubled, isolated and passed pawns), rooks on open files and the bishop
+pair. Pawn structure only changes when a pawn moves, so its score is kept in
+a PawnTable under the position's pawn key, and the whole score is kept in a
+direct-mapped EvalCache under the full key, since the search reaches the
+same leaves many times.
+"""
+
+from array import array
+
+from engine.constants import (WHITE, BLACK, EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+                              PIECE_VALUES, make_piece, piece_color, piece_type)
+from engine.bitboard import FILE_A
+
+# Pawn structure, in the same units as PIECE_VALUES
+DOUBLED_PAWN_PENALTY = 1.5
+ISOLATED_PAWN_PENALTY = 1.5
+# Bonus for a passed pawn by how many ranks it has advanced
+PASSED_PAWN_BONUS = (0, 0.5, 1, 1.5, 3, 5, 8, 0)
+ROOK_OPEN_FILE_BONUS = 1.5
+ROOK_HALF_OPEN_FILE_BONUS = 0.75
+BISHOP_PAIR_BONUS = 3
+
+# Default cache sizes, in entries
+EVAL_CACHE_ENTRIES = 1 << 16
+PAWN_TABLE_ENTRIES = 1 << 14
+
+PIECE_SQUARE_TABLES = {
+    PAWN: [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [5, 5, 5, 5, 5, 5, 5, 5],
+        [1, 1, 2, 3, 3, 2, 1, 1],
+        [.5, .5, 1, 2.5, 2.5, 1, .5, .5],
+        [0, 0, 0, 2, 2, 0, 0, 0],
+        [.5, -.5, -1, 0, 0, -1, -.5, .5],
+        [.5, 1, 1, -2, -2, 1, 1, .5],
+        [0, 0, 0, 0, 0, 0, 0, 0]
+    ],
+    KNIGHT: [
+        [-5, -4, -3, -3, -3, -3, -4, -5],
+        [-4, -2, 0, 0, 0, 0, -2, -4],
+        [-3, 0, 1, 1.5, 1.5, 1, 0, -3],
+        [-3, .5, 1.5, 2, 2, 1.5, .5, -3],
+        [-3, 0, 1.5, 2, 2, 1.5, 0, -3],
+        [-3, .5, 1, 1.5, 1.5, 1, .1, -3],
+        [-4, -2, 0, .5, .5, 0, -2, -4],
+        [-5, -4, -3, -3, -3, -3, -4, -5]
+    ],
+    BISHOP: [
+        [-2, -1, -1, -1, -1, -1, -1, -2],
+        [-1, 0, 0, 0, 0, 0, 0, -1],
+        [-1, 0, .5, 1, 1, .5, 0, -1],
+        [-1, .5, .5, 1, 1, .5, .5, -1],
+        [-1, 0, 1, 1, 1, 1, 0, -1],
+        [-1, 1, 1, 1, 1, 1, 1, -1],
+        [-1, .5, 0, 0, 0, 0, .5, -1],
+        [-2, -1, -1, -1, -1, -1, -1, -2]
+    ],
+    ROOK: [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [.5, 1, 1, 1, 1, 1, 1, .5],
+        [-.5, 0, 0, 0, 0, 0, 0, -.5],
+        [-.5, 0, 0, 0, 0, 0, 0, -.5],
+        [-.5, 0, 0, 0, 0, 0, 0, -.5],
+        [-.5, 0, 0, 0, 0, 0, 0, -.5],
+        [-.5, 0, 0, 0, 0, 0, 0, -.5],
+        [0, 0, 0, .5, .5, 0, 0, 0]
+    ],
+    QUEEN: [
+        [-2, -1, -1, -.5, -.5, -1, -1, -2],
+        [-1, 0, 0, 0, 0, 0, 0, -1],
+        [-1, 0, .5, .5, .5, .5, 0, -1],
+        [-.5, 0, .5, .5, .5, .5, 0, -.5],
+        [0, 0, .5, .5, .5, .5, 0, -.5],
+        [-1, .5, .5, .5, .5, .5, 0, -1],
+        [-1, 0, .5, 0, 0, 0, 0, -1],
+        [-2, -1, -1, -.5, -.5, -1, -1, -2]
+    ],
+    KING: [
+        [-3, -4, -4, -5, -5, -4, -4, -3],
+        [-3, -4, -4, -5, -5, -4, -4, -3],
+        [-3, -4, -4, -5, -5, -4, -4, -3],
+        [-3, -4, -4, -5, -5, -4, -4, -3],
+        [-2, -3, -3, -4, -4, -3, -3, -2],
+        [-1, -2, -2, -2, -2, -2, -2, -1],
+        [2, 2, 0, 0, 0, 0, 2, 2],
+        [2, 3, 1, 0, 0, 1, 3, 2]
+    ],
+}
+
+
+def _build_tables():
+    psq_tables = [array('d', bytes(8 * 64)) for _ in range(15)]
+    material = [0] * 15
+    for kind, rows in PIECE_SQUARE_TABLES.items():
+        # White reads the tables upside down; Black's bonuses count against White
+        psq_tables[make_piece(WHITE, kind)] = array('d', (rows[7 - (sq >> 3)][sq & 7] for sq in range(64)))
+        psq_tables[make_piece(BLACK, kind)] = array('d', (-rows[sq >> 3][sq & 7] for sq in range(64)))
+        # Both kings are always on the board, so they add nothing to the balance
+        if kind != KING:
+            material[make_piece(WHITE, kind)] = material[make_piece(BLACK, kind)] = PIECE_VALUES[kind]
+    return psq_tables, tuple(material)
+
+
+# Indexed by piece code, then square: the bonus from White's point of view
+# PIECE_MATERIAL is indexed by piece code and counts for the piece's own color
+PSQ_TABLES, PIECE_MATERIAL = _build_tables()
+
+FILE_MASKS = tuple(FILE_A << file for file in range(8))
+ADJACENT_FILES = tuple((FILE_MASKS[file - 1] if file > 0 else 0) | (FILE_MASKS[file + 1] if file < 7 else 0)
+                       for file in range(8))
+
+
+def _passed_masks(color):
+    # The squares in front of a pawn, on its own and the adjacent files, that an enemy
+    # pawn would have to stand on to stop it
+    masks = []
+    for sq in range(64):
+        row, file = sq >> 3, sq & 7
+        rows = range(row + 1, 8) if color == WHITE else range(row)
+        front = sum(0xFF << (8 * r) for r in rows)
+        masks.append(front & (FILE_MASKS[file] | ADJACENT_FILES[file]))
+    return tuple(masks)
+
+
+# Indexed by color, then square
+PASSED_MASKS = (_passed_masks(WHITE), _passed_masks(BLACK))
+
+
+def piece_square_value(piece, sq):
+    """
+    Look up the piece-square bonus for a piece standing on a square.
+
+    Parameters:
+    - piece (int): The piece code.
+    - sq (int): The square index.
+
+    Returns:
+    - float: The bonus, from the piece owner's point of view.
+    """
+    row, col = sq >> 3, sq & 7
+    table = PIECE_SQUARE_TABLES[piece_type(piece)]
+    if piece_color(piece) == WHITE:
+        return table[7 - row][col]
+    return table[row][col]
+
+
+def evaluate(pos):
+    """
+    Score a position by material and piece placement, using the sums the position
+    keeps up to date as moves are made.
+
+    Parameters:
+    - pos (Position): The position to score.
+
+    Returns:
+    - float: The score from White's point of view.
+    """
+    return pos.material[WHITE] - pos.material[BLACK] + pos.psq
+
+
+def evaluate_full(pos):
+    """
+    Score a position by scanning the board. This is what evaluate() computes
+    incrementally; engine.consistency checks the position's running sums against it.
+
+    Parameters:
+    - pos (Position): The position to score.
+
+    Returns:
+    - float: The score from White's point of view.
+    """
+    score = 0
+    for sq, piece in enumerate(pos.squares):
+        if piece == EMPTY:
+            continue
+        value = PIECE_MATERIAL[piece] + piece_square_value(piece, sq)
+        score += value if piece_color(piece) == WHITE else -value
+    return score
+
+
+def pawn_structure(white_pawns, black_pawns):
+    """
+    Score the pawn structure: doubled, isolated and passed pawns.
+
+    Parameters:
+    - white_pawns (int): Bitboard of White's pawns.
+    - black_pawns (int): Bitboard of Black's pawns.
+
+    Returns:
+    - score (float): The pawn structure score from White's point of view.
+    - files (int): Files without a White pawn in the low 8 bits, and files without a
+      Black pawn in the next 8.
+    """
+    score = 0
+    files = 0
+    for color, pawns, enemy, sign in ((WHITE, white_pawns, black_pawns, 1), (BLACK, black_pawns, white_pawns, -1)):
+        penalty = 0
+        for file in range(8):
+            count = (pawns & FILE_MASKS[file]).bit_count()
+            if not count:
+                files |= 1 << (file + 8 * color)
+                continue
+            penalty += DOUBLED_PAWN_PENALTY * (count - 1)
+            if not pawns & ADJACENT_FILES[file]:
+                penalty += ISOLATED_PAWN_PENALTY * count
+        bonus = 0
+        passed_masks = PASSED_MASKS[color]
+        remaining = pawns
+        while remaining:
+            low = remaining & -remaining
+            sq = low.bit_length() - 1
+            if not passed_masks[sq] & enemy:
+                bonus += PASSED_PAWN_BONUS[sq >> 3 if color == WHITE else 7 - (sq >> 3)]
+            remaining ^= low
+        score += sign * (bonus - penalty)
+    return score, files
+
+
+class PawnTable:
+    def __init__(self, entries=PAWN_TABLE_ENTRIES):
+        """
+        Initialize the PawnTable object, a direct-mapped table of pawn structure scores
+        keyed by the pawn key.
+
+        Parameters:
+        - entries (int): Number of entries; the table never grows past it.
+        """
+        self.entries = max(1, entries)
+        self.keys = array('Q', bytes(8 * self.entries))
+        self.scores = array('d', bytes(8 * self.entries))
+        self.files = array('H', bytes(2 * self.entries))
+        # Pawnless positions have a pawn key of 0, so a slot's key alone cannot mark it as used
+        self.filled = bytearray(self.entries)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the probe and hit counters."""
+        self.probes = 0
+        self.hits = 0
+
+    def lookup(self, pos):
+        """
+        Return the pawn structure score and file masks of a position, see pawn_structure,
+        computing and storing them on a miss.
+        """
+        key = pos.pawn_key
+        slot = key % self.entries
+        self.probes += 1
+        if self.keys[slot] == key and self.filled[slot]:
+            self.hits += 1
+            return self.scores[slot], self.files[slot]
+        score, files = pawn_structure(pos.bitboards[PAWN], pos.bitboards[PAWN | 8])
+        self.keys[slot] = key
+        self.filled[slot] = 1
+        self.scores[slot] = score
+        self.files[slot] = files
+        return score, files
+
+    def stats(self):
+        """Return the entries, probes, hits and hit rate since the counters were reset."""
+        return {"entries": self.entries, "probes": self.probes, "hits": self.hits,
+                "hit_rate": self.hits / self.probes if self.probes else 0.0}
+
+
+class EvalCache:
+    def __init__(self, entries=EVAL_CACHE_ENTRIES):
+        """
+        Initialize the EvalCache object, a direct-mapped table of evaluations keyed by the
+        full Zobrist key, which is stored so a slot shared by two positions is a miss.
+
+        Parameters:
+        - entries (int): Number of entries; the table never grows past it.
+        """
+        self.entries = max(1, entries)
+        self.keys = array('Q', bytes(8 * self.entries))
+        self.scores = array('d', bytes(8 * self.entries))
+        # Slots holding an evaluation, since a position's key may be 0 like an empty slot's
+        self.filled = bytearray(self.entries)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the probe and hit counters."""
+        self.probes = 0
+        self.hits = 0
+
+    def stats(self):
+        """Return the entries, probes, hits and hit rate since the counters were reset."""
+        return {"entries": self.entries, "probes": self.probes, "hits": self.hits,
+                "hit_rate": self.hits / self.probes if self.probes else 0.0}
+
+
+class Evaluator:
+    def __init__(self, eval_entries=EVAL_CACHE_ENTRIES, pawn_entries=PAWN_TABLE_ENTRIES):
+        """
+        Initialize the Evaluator object.
+
+        Parameters:
+        - eval_entries (int): Size of the evaluation cache in entries, 0 for no cache.
+        - pawn_entries (int): Size of the pawn table in entries, 0 to score the pawn
+          structure afresh every time.
+        """
+        self.cache = EvalCache(eval_entries) if eval_entries else None
+        self.pawns = PawnTable(pawn_entries) if pawn_entries else None
+
+    def reset_stats(self):
+        """Reset the counters of both caches."""
+        if self.cache is not None:
+            self.cache.reset_stats()
+        if self.pawns is not None:
+            self.pawns.reset_stats()
+
+    def stats(self):
+        """Return the statistics of the evaluation cache and the pawn table, None when off."""
+        return {"eval_cache": self.cache.stats() if self.cache is not None else None,
+                "pawn_table": self.pawns.stats() if self.pawns is not None else None}
+
+    def evaluate(self, pos):
+        """
+        Score a position by material, piece placement, pawn structure, rooks on open files
+        and the bishop pair.
+
+        Parameters:
+        - pos (Position): The position to score.
+
+        Returns:
+        - float: The score from White's point of view.
+        """
+        cache = self.cache
+        if cache is not None:
+            key = pos.key
+            slot = key % cache.entries
+            cache.probes += 1
+            if cache.keys[slot] == key and cache.filled[slot]:
+                cache.hits += 1
+                return cache.scores[slot]
+
+        if self.pawns is not None:
+            pawn_score, files = self.pawns.lookup(pos)
+        else:
+            pawn_score, files = pawn_structure(pos.bitboards[PAWN], pos.bitboards[PAWN | 8])
+        score = pos.material[WHITE] - pos.material[BLACK] + pos.psq + pawn_score
+
+        bb = pos.bitboards
+        if bb[BISHOP].bit_count() >= 2:
+            score += BISHOP_PAIR_BONUS
+        if bb[BISHOP | 8].bit_count() >= 2:
+            score -= BISHOP_PAIR_BONUS
+        for color, sign in ((WHITE, 1), (BLACK, -1)):
+            rooks = bb[ROOK | color << 3]
+            while rooks:
+                low = rooks & -rooks
+                file = (low.bit_length() - 1) & 7
+                # A file without our pawns is half open, and open without theirs as well
+                if files >> (file + 8 * color) & 1:
+                    if files >> (file + 8 * (color ^ 1)) & 1:
+                        score += sign * ROOK_OPEN_FILE_BONUS
+                    else:
+                        score += sign * ROOK_HALF_OPEN_FILE_BONUS
+                rooks ^= low
+
+        if cache is not None:
+            cache.keys[slot] = key
+            cache.scores[slot] = score
+            cache.filled[slot] = 1
+        return score
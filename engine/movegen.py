@@ -0,0 +1,406 @@
+"""
+Move generation, legality and game-over detection for the rules core.
+
+Everything works on the Position's bitboards: attack sets come from the
+precomputed tables in engine.bitboard and targets are picked out with masks
+instead of walking the board square by square.
+
+Legal moves are produced directly rather than by trying each move and testing
+the king: the pieces giving check and the pieces pinned to the king are found
+once per position, then every target set is masked with the check-evasion
+squares and each pinned piece is kept on its pin ray.
+"""
+
+from engine.constants import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from engine.constants import WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+from engine.bitboard import (FULL, RANK_3, RANK_6, RANK_1, RANK_8, NOT_A, NOT_H, iter_squares,
+                             KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, LINE,
+                             lsb)
+from engine.magic import rook_attacks, bishop_attacks
+from engine.moves import (QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EP_CAPTURE,
+                          PROMOTION, MOVES, from_square)
+
+# Castling: (color, right, king from, king to, must be empty, must not be attacked, flag)
+CASTLES = (
+    (WHITE, WHITE_KINGSIDE, 4, 6, 0x60, 0x70, KING_CASTLE),
+    (WHITE, WHITE_QUEENSIDE, 4, 2, 0x0E, 0x1C, QUEEN_CASTLE),
+    (BLACK, BLACK_KINGSIDE, 60, 62, 0x60 << 56, 0x70 << 56, KING_CASTLE),
+    (BLACK, BLACK_QUEENSIDE, 60, 58, 0x0E << 56, 0x1C << 56, QUEEN_CASTLE),
+)
+
+CHECKMATE = "checkmate"
+STALEMATE = "stalemate"
+
+
+def piece_attacks(kind, color, sq, occupied):
+    """
+    Return the bitboard of squares attacked by a piece.
+
+    Parameters:
+    - kind (int): The piece type.
+    - color (int): The piece's color, needed for pawns.
+    - sq (int): The square the piece stands on.
+    - occupied (int): Bitboard of all pieces, needed for sliders.
+
+    Returns:
+    - int: The attacked squares.
+    """
+    if kind == PAWN:
+        return PAWN_ATTACKS[color][sq]
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if kind == BISHOP:
+        return bishop_attacks(sq, occupied)
+    if kind == ROOK:
+        return rook_attacks(sq, occupied)
+    if kind == QUEEN:
+        return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+    return KING_ATTACKS[sq]
+
+
+def attackers_to(pos, sq, by_color, occupied=None):
+    """
+    Return the bitboard of pieces of a color that attack a square.
+
+    Parameters:
+    - pos (Position): The position to inspect.
+    - sq (int): The target square.
+    - by_color (int): The attacking color.
+    - occupied (int): Occupancy to use for sliders, defaults to the position's.
+
+    Returns:
+    - int: Bitboard of the attacking pieces.
+    """
+    if occupied is None:
+        occupied = pos.occupied[0] | pos.occupied[1]
+    bb = pos.bitboards
+    base = by_color << 3
+    queens = bb[base | QUEEN]
+    return ((PAWN_ATTACKS[by_color ^ 1][sq] & bb[base | PAWN])
+            | (KNIGHT_ATTACKS[sq] & bb[base | KNIGHT])
+            | (KING_ATTACKS[sq] & bb[base | KING])
+            | (bishop_attacks(sq, occupied) & (bb[base | BISHOP] | queens))
+            | (rook_attacks(sq, occupied) & (bb[base | ROOK] | queens)))
+
+
+def is_square_attacked(pos, sq, by_color):
+    """
+    Check whether a square is attacked by any piece of the given color.
+
+    Parameters:
+    - pos (Position): The position to inspect.
+    - sq (int): The square to test.
+    - by_color (int): The attacking color.
+
+    Returns:
+    - bool: True if the square is attacked.
+    """
+    return attackers_to(pos, sq, by_color) != 0
+
+
+def attack_map(pos, color):
+    """
+    Compute the squares a side attacks. The opposing king is taken off the board
+    first, so squares behind it on a checking ray count as attacked; that is what
+    king moves and castling need.
+
+    Parameters:
+    - pos (Position): The position to inspect.
+    - color (int): The attacking side.
+
+    Returns:
+    - int: Bitboard of attacked squares.
+    """
+    bb = pos.bitboards
+    base = color << 3
+    occupied = (pos.occupied[0] | pos.occupied[1]) ^ (1 << pos.king_square[color ^ 1])
+
+    pawns = bb[base | PAWN]
+    if color == WHITE:
+        attacked = (((pawns << 7) & NOT_H) | ((pawns << 9) & NOT_A)) & FULL
+    else:
+        attacked = ((pawns >> 9) & NOT_H) | ((pawns >> 7) & NOT_A)
+    for kind in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        for sq in iter_squares(bb[base | kind]):
+            attacked |= piece_attacks(kind, color, sq, occupied)
+    return attacked
+
+
+def attacked_squares(pos, sq):
+    """
+    List the squares attacked by the piece standing on a square.
+
+    Parameters:
+    - pos (Position): The position to inspect.
+    - sq (int): The square holding the piece.
+
+    Returns:
+    - list: Attacked square indices.
+    """
+    piece = pos.squares[sq]
+    return list(iter_squares(piece_attacks(piece & 7, piece >> 3, sq, pos.all_occupied)))
+
+
+def pseudo_legal_moves(pos):
+    """
+    Generate every move for the side to move without checking whether it leaves
+    the king in check. Castling is only generated when it is fully legal. The search
+    does not use it: engine.consistency checks legal_moves() against these moves
+    filtered with is_legal().
+
+    Parameters:
+    - pos (Position): The position to generate moves for.
+
+    Returns:
+    - list: Encoded moves.
+    """
+    us = pos.turn
+    them = us ^ 1
+    bb = pos.bitboards
+    own = pos.occupied[us]
+    enemy = pos.occupied[them]
+    occupied = own | enemy
+    base = us << 3
+    moves = []
+
+    _pawn_moves(pos, us, bb[base | PAWN], enemy, occupied, moves)
+
+    for kind in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        for sq in iter_squares(bb[base | kind]):
+            targets = piece_attacks(kind, us, sq, occupied) & ~own
+            captures = MOVES[CAPTURE][sq]
+            quiets = MOVES[QUIET][sq]
+            for target in iter_squares(targets & enemy):
+                moves.append(captures[target])
+            for target in iter_squares(targets & ~enemy):
+                moves.append(quiets[target])
+
+    for color, right, king_from, king_to, between_mask, safe, flag in CASTLES:
+        if color != us or not pos.castling & right or occupied & between_mask:
+            continue
+        if pos.attacked_by(them) & safe:
+            continue
+        moves.append(MOVES[flag][king_from][king_to])
+
+    return moves
+
+
+def _pawn_moves(pos, us, pawns, enemy, occupied, moves, target_mask=FULL):
+    empty = FULL ^ occupied
+    if us == WHITE:
+        step = 8
+        single = (pawns << 8) & empty
+        double = ((single & RANK_3) << 8) & empty
+        left = (pawns << 7) & NOT_H
+        right = (pawns << 9) & NOT_A
+        last_rank = RANK_8
+    else:
+        step = -8
+        single = (pawns >> 8) & empty
+        double = ((single & RANK_6) >> 8) & empty
+        left = (pawns >> 9) & NOT_H
+        right = (pawns >> 7) & NOT_A
+        last_rank = RANK_1
+
+    for target in iter_squares(single & target_mask):
+        _add_pawn_move(target - step, target, last_rank >> target & 1, False, moves)
+    for target in iter_squares(double & target_mask):
+        moves.append(MOVES[DOUBLE_PUSH][target - 2 * step][target])
+
+    for captures, offset in ((left, step - 1), (right, step + 1)):
+        for target in iter_squares(captures & enemy & target_mask):
+            _add_pawn_move(target - offset, target, last_rank >> target & 1, True, moves)
+        if pos.ep_square is not None and captures >> pos.ep_square & 1:
+            move = MOVES[EP_CAPTURE][pos.ep_square - offset][pos.ep_square]
+            # En passant removes two pieces from one rank, so it is checked by playing it
+            if is_legal(pos, move):
+                moves.append(move)
+
+
+def _add_pawn_move(from_sq, to_sq, promotes, captures, moves):
+    if promotes:
+        base = PROMOTION | (CAPTURE if captures else 0)
+        # Queen first so callers picking the first promotion get the usual choice
+        for promo in (3, 0, 1, 2):
+            moves.append(MOVES[base | promo][from_sq][to_sq])
+    else:
+        moves.append(MOVES[CAPTURE if captures else QUIET][from_sq][to_sq])
+
+
+def is_legal(pos, move):
+    """
+    Check that a pseudo-legal move does not leave the mover's king in check.
+
+    Parameters:
+    - pos (Position): The position before the move.
+    - move (int): The encoded pseudo-legal move.
+
+    Returns:
+    - bool: True if the move is legal.
+    """
+    us = pos.turn
+    pos.make_move(move)
+    legal = not is_square_attacked(pos, pos.king_square[us], us ^ 1)
+    pos.unmake_move()
+    return legal
+
+
+def pins(pos, us, king, occupied):
+    """
+    Find the pieces of one side that are pinned to their king.
+
+    Parameters:
+    - pos (Position): The position to inspect.
+    - us (int): The side whose pinned pieces are wanted.
+    - king (int): That side's king square.
+    - occupied (int): Bitboard of all pieces.
+
+    Returns:
+    - pinned (int): Bitboard of the pinned pieces.
+    - pin_rays (dict): For each pinned square, the squares it may still move to.
+    """
+    bb = pos.bitboards
+    them = us ^ 1
+    base = them << 3
+    queens = bb[base | QUEEN]
+    enemy = pos.occupied[them]
+    snipers = ((rook_attacks(king, enemy) & (bb[base | ROOK] | queens))
+               | (bishop_attacks(king, enemy) & (bb[base | BISHOP] | queens)))
+
+    pinned = 0
+    pin_rays = {}
+    for sniper in iter_squares(snipers):
+        blockers = BETWEEN[king << 6 | sniper] & occupied
+        if blockers and not blockers & (blockers - 1) and blockers & pos.occupied[us]:
+            pinned |= blockers
+            pin_rays[lsb(blockers)] = LINE[king << 6 | sniper]
+    return pinned, pin_rays
+
+
+def legal_moves(pos, captures_only=False, moves=None):
+    """
+    Generate all legal moves for the side to move.
+
+    Parameters:
+    - pos (Position): The position to generate moves for.
+    - captures_only (bool): Only generate captures and promotions, for the quiescence
+      search.
+    - moves (list): An empty list to add the moves to, such as a buffer the search reuses
+      at every node of a ply, or None for a new list.
+
+    Returns:
+    - list: Encoded legal moves, in moves when it was given.
+    """
+    us = pos.turn
+    them = us ^ 1
+    bb = pos.bitboards
+    own = pos.occupied[us]
+    enemy = pos.occupied[them]
+    occupied = own | enemy
+    base = us << 3
+    king = pos.king_square[us]
+    if moves is None:
+        moves = []
+
+    # The enemy attack map is built with our king off the board, so any square
+    # outside it is safe for the king
+    danger = pos.attacked_by(them)
+    king_targets = KING_ATTACKS[king] & ~own & ~danger
+    if captures_only:
+        king_targets &= enemy
+    captures = MOVES[CAPTURE][king]
+    quiets = MOVES[QUIET][king]
+    for target in iter_squares(king_targets):
+        moves.append(captures[target] if enemy >> target & 1 else quiets[target])
+
+    checkers = attackers_to(pos, king, them, occupied) if danger >> king & 1 else 0
+    if checkers & (checkers - 1):
+        # Double check: only king moves are possible
+        return moves
+
+    target_mask = FULL ^ own
+    if checkers:
+        # Single check: capture the checker or block the line to it
+        target_mask &= checkers | BETWEEN[king << 6 | lsb(checkers)]
+
+    pawn_mask = target_mask
+    if captures_only:
+        pawn_mask &= enemy | RANK_1 | RANK_8
+        target_mask &= enemy
+
+    pinned, pin_rays = pins(pos, us, king, occupied)
+
+    start = len(moves)
+    _pawn_moves(pos, us, bb[base | PAWN], enemy, occupied, moves, pawn_mask)
+    if pinned:
+        moves[start:] = [move for move in moves[start:]
+                         if not pinned >> (move & 63) & 1 or pin_rays[move & 63] >> ((move >> 6) & 63) & 1]
+
+    for kind in (KNIGHT, BISHOP, ROOK, QUEEN):
+        pieces = bb[base | kind]
+        if kind == KNIGHT:
+            # A pinned knight can never stay on its pin ray
+            pieces &= ~pinned
+        for sq in iter_squares(pieces):
+            targets = piece_attacks(kind, us, sq, occupied) & target_mask
+            if pinned >> sq & 1:
+                targets &= pin_rays[sq]
+            captures = MOVES[CAPTURE][sq]
+            quiets = MOVES[QUIET][sq]
+            for target in iter_squares(targets & enemy):
+                moves.append(captures[target])
+            for target in iter_squares(targets & ~enemy):
+                moves.append(quiets[target])
+
+    if not checkers and not captures_only:
+        for color, right, king_from, king_to, between_mask, safe, flag in CASTLES:
+            if color != us or not pos.castling & right or occupied & between_mask or danger & safe:
+                continue
+            moves.append(MOVES[flag][king_from][king_to])
+
+    return moves
+
+
+def legal_moves_from(pos, sq):
+    """
+    Generate the legal moves for the piece standing on a square.
+
+    Parameters:
+    - pos (Position): The position to generate moves for.
+    - sq (int): The origin square.
+
+    Returns:
+    - list: Encoded legal moves starting on the square.
+    """
+    return [move for move in legal_moves(pos) if from_square(move) == sq]
+
+
+def is_in_check(pos, color=None):
+    """
+    Check whether a side's king is attacked.
+
+    Parameters:
+    - pos (Position): The position to inspect.
+    - color (int): The side to test, defaults to the side to move.
+
+    Returns:
+    - bool: True if the king is in check.
+    """
+    if color is None:
+        color = pos.turn
+    return bool(pos.attacked_by(color ^ 1) >> pos.king_square[color] & 1)
+
+
+def game_result(pos):
+    """
+    Detect whether the side to move has been checkmated or stalemated.
+
+    Parameters:
+    - pos (Position): The position to inspect.
+
+    Returns:
+    - str: CHECKMATE or STALEMATE if the game is over, otherwise None.
+    """
+    if legal_moves(pos):
+        return None
+    return CHECKMATE if is_in_check(pos) else STALEMATE
@@ -0,0 +1,89 @@
+"""
+Integer move encoding.
+
+A move packs the origin square into bits 0-5, the destination square into
+bits 6-11 and a four bit flag into bits 12-15. Capture moves have bit 2 of the
+flag set and promotions have bit 3 set, with the low two bits selecting the
+promotion piece.
+"""
+
+from engine.constants import KNIGHT, square_name
+
+QUIET = 0
+DOUBLE_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+EP_CAPTURE = 5
+PROMOTION = 8
+PROMOTION_CAPTURE = 12
+
+NULL_MOVE = 0
+
+PROMOTION_LETTERS = "nbrq"
+
+
+def encode(from_sq, to_sq, flag=QUIET):
+    """
+    Pack a move into an int.
+
+    Parameters:
+    - from_sq (int): Origin square.
+    - to_sq (int): Destination square.
+    - flag (int): Move flag, such as CAPTURE or KING_CASTLE.
+
+    Returns:
+    - int: The encoded move.
+    """
+    return from_sq | (to_sq << 6) | (flag << 12)
+
+
+# Every encoded move, as MOVES[flag][from][to]. The move generator looks its moves up here
+# rather than encoding them, so it hands out these ints instead of allocating new ones
+MOVES = tuple(tuple(tuple(encode(from_sq, to_sq, flag) for to_sq in range(64)) for from_sq in range(64))
+              for flag in range(16))
+
+
+def from_square(move):
+    return move & 63
+
+
+def to_square(move):
+    return (move >> 6) & 63
+
+
+def move_flag(move):
+    return move >> 12
+
+
+def is_capture(move):
+    return bool((move >> 12) & CAPTURE)
+
+
+def is_promotion(move):
+    return bool((move >> 12) & PROMOTION)
+
+
+def is_castle(move):
+    return (move >> 12) in (KING_CASTLE, QUEEN_CASTLE)
+
+
+def promotion_type(move):
+    """Return the piece type a promotion move promotes to."""
+    return ((move >> 12) & 3) + KNIGHT
+
+
+def to_uci(move):
+    """
+    Format a move in UCI notation, e.g. 'e2e4' or 'e7e8q'.
+
+    Parameters:
+    - move (int): The encoded move.
+
+    Returns:
+    - str: The move in UCI notation.
+    """
+    text = square_name(from_square(move)) + square_name(to_square(move))
+    if is_promotion(move):
+        text += PROMOTION_LETTERS[(move >> 12) & 3]
+    return text
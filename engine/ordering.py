@@ -0,0 +1,152 @@
+"""
+Move ordering for the search.
+
+Alpha-beta prunes the most when the best move is searched first, so moves
+are scored and sorted before a node searches them: the transposition table's
+move first, then captures by MVV-LVA (most valuable victim, least valuable
+attacker), then the killer moves that caused cutoffs at the same ply, then
+quiet moves by how often they have caused cutoffs anywhere in the search.
+Captures of a cheaper piece that the static exchange evaluation shows lose
+material go after the quiet moves.
+"""
+
+from engine.constants import PIECE_VALUES, PAWN, KING, QUEEN, MAX_PLY
+from engine.moves import EP_CAPTURE, is_promotion, promotion_type
+from engine.see import see
+
+HASH_MOVE_SCORE = 10000000
+CAPTURE_SCORE = 1000000
+# Losing captures score this plus what they lose, below every quiet move
+LOSING_CAPTURE_SCORE = -1000000
+KILLER_SCORES = (900000, 800000)
+# History scores are halved once any of them reaches this, so they stay below the killers
+HISTORY_LIMIT = 500000
+
+# MVV-LVA score of a capture, as CAPTURE_SCORES[victim type][attacker type]
+CAPTURE_SCORES = tuple(tuple(CAPTURE_SCORE + PIECE_VALUES[victim] * 100 - PIECE_VALUES[attacker]
+                             for attacker in range(KING + 1)) for victim in range(KING + 1))
+
+
+class MoveOrderer:
+    def __init__(self):
+        """
+        Initialize the MoveOrderer object with empty killer and history tables.
+        """
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        # Indexed by piece code, then destination square
+        self.history = [[0] * 64 for _ in range(15)]
+
+    def clear(self):
+        """Forget all killer moves and history scores."""
+        for slot in self.killers:
+            slot[0] = slot[1] = 0
+        self.history = [[0] * 64 for _ in range(15)]
+
+    def age(self):
+        """
+        Carry the tables over to a new search: killers are tied to plies of the old
+        search and are dropped, history scores are halved so recent cutoffs count more.
+        """
+        for slot in self.killers:
+            slot[0] = slot[1] = 0
+        self.halve_history()
+
+    def halve_history(self):
+        """Halve every history score."""
+        for row in self.history:
+            row[:] = [value // 2 for value in row]
+
+    def score_move(self, pos, move, hash_move, ply, exchanges=True):
+        """
+        Score a move for ordering; higher scores are searched first.
+
+        Parameters:
+        - pos (Position): The position the move is played from.
+        - move (int): The encoded move.
+        - hash_move (int): The transposition table's move for this position, or 0.
+        - ply (int): Distance from the root.
+        - exchanges (bool): Check captures of a cheaper piece with the static exchange
+          evaluation and put the losing ones last.
+
+        Returns:
+        - int: The ordering score.
+        """
+        if move == hash_move:
+            return HASH_MOVE_SCORE
+
+        squares = pos.squares
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        flag = move >> 12
+        attacker = squares[from_sq]
+
+        if flag & 4:
+            victim = squares[to_sq] & 7 if flag != EP_CAPTURE else PAWN
+            if exchanges and PIECE_VALUES[victim] < PIECE_VALUES[attacker & 7]:
+                exchange = see(pos, move)
+                if exchange < 0:
+                    return LOSING_CAPTURE_SCORE + exchange
+            score = CAPTURE_SCORES[victim][attacker & 7]
+            if flag & 8:
+                score += PIECE_VALUES[promotion_type(move)] * 100
+            return score
+
+        if is_promotion(move):
+            # Queen promotions rank with good captures, under-promotions last
+            return CAPTURE_SCORE + PIECE_VALUES[QUEEN] * 100 if promotion_type(move) == QUEEN else 0
+
+        killers = self.killers[ply]
+        if move == killers[0]:
+            return KILLER_SCORES[0]
+        if move == killers[1]:
+            return KILLER_SCORES[1]
+        return self.history[attacker][to_sq]
+
+    def order(self, pos, moves, hash_move, ply, exchanges=True):
+        """
+        Sort moves in place, best first.
+
+        Parameters:
+        - pos (Position): The position the moves are played from.
+        - moves (list): The encoded moves.
+        - hash_move (int): The transposition table's move for this position, or 0.
+        - ply (int): Distance from the root.
+        - exchanges (bool): Put captures that lose material last, see score_move.
+
+        Returns:
+        - list: The same list, sorted.
+        """
+        score_move = self.score_move
+        moves.sort(key=lambda move: score_move(pos, move, hash_move, ply, exchanges), reverse=True)
+        return moves
+
+    def is_killer(self, move, ply):
+        """Return True if the move is one of the killer moves for the ply."""
+        killers = self.killers[ply]
+        return move == killers[0] or move == killers[1]
+
+    def record_cutoff(self, pos, move, depth, ply):
+        """
+        Remember a quiet move that caused a beta cutoff, as a killer for this ply and in
+        the history table.
+
+        Parameters:
+        - pos (Position): The position the move was played from.
+        - move (int): The encoded move.
+        - depth (int): Remaining depth at the node.
+        - ply (int): Distance from the root.
+        """
+        if move >> 12 & 12:
+            # Captures and promotions are already ordered first
+            return
+
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        row = self.history[pos.squares[move & 63]]
+        to_sq = (move >> 6) & 63
+        row[to_sq] += depth * depth
+        if row[to_sq] >= HISTORY_LIMIT:
+            self.halve_history()
@@ -0,0 +1,180 @@
+"""
+Lazy SMP: one search spread over several processes.
+
+Python threads cannot search in parallel, so ParallelSearcher runs helper
+searchers in separate processes. The transposition table lives in shared
+memory and every searcher reads and writes it. Nothing else is shared: each
+helper searches the same position on its own, with its own tie-breaking
+seed, and the entries it stores let the others cut off or order moves
+sooner. The main searcher's result is the one returned; the helpers stop
+when it does.
+
+Helpers are started on the first search and kept for the searcher's
+lifetime, so only the first move pays for starting the processes. close()
+shuts them down and frees the shared table.
+"""
+
+import gc
+import multiprocessing
+import queue
+import weakref
+from multiprocessing.shared_memory import SharedMemory
+
+from engine.search import Searcher, MAX_DEPTH
+from engine.transposition import TranspositionTable, GENERATIONS, table_bytes
+from engine.worker import CancellationToken
+
+# Seconds to wait for a helper to report back after it is told to stop
+HELPER_STOP_TIMEOUT = 5.0
+
+
+def _helper_main(name, hash_mb, seed, options, tasks, results, stop):
+    # Runs in a helper process until it is sent None; it only searches, so the collector is off
+    gc.disable()
+    memory = SharedMemory(name=name)
+    table = TranspositionTable(hash_mb, memory.buf)
+    searcher = Searcher(hash_mb, seed, table=table, **options)
+    token = CancellationToken(stop)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            if task == "new_game":
+                searcher.orderer.clear()
+                searcher.last_pv = []
+                continue
+            position, max_depth, generation = task
+            # search() starts a new generation; make it the one the main searcher uses
+            table.generation = (generation - 1) % GENERATIONS
+            result = searcher.search(position, max_depth, token=token)
+            results.put((result.nodes, result.depth))
+    finally:
+        table.release()
+        memory.close()
+
+
+def _stop_helpers(helpers, task_queues):
+    for tasks in task_queues:
+        tasks.put(None)
+    for helper in helpers:
+        helper.join(HELPER_STOP_TIMEOUT)
+        if helper.is_alive():
+            helper.terminate()
+    helpers.clear()
+    task_queues.clear()
+
+
+def _shutdown(helpers, task_queues, table, memory):
+    _stop_helpers(helpers, task_queues)
+    table.release()
+    memory.close()
+    memory.unlink()
+
+
+class ParallelSearcher(Searcher):
+    def __init__(self, hash_mb=16, seed=None, workers=2, **options):
+        """
+        Initialize the ParallelSearcher object.
+
+        Parameters:
+        - hash_mb (float): Memory budget for the shared transposition table in megabytes.
+        - seed (int): Seed for breaking ties between equally good root moves. Helper n is
+          seeded with seed + n, so the helpers order equal moves differently.
+        - workers (int): Processes searching in total, this one included. With 1 it
+          searches exactly like Searcher.
+        - options: Searcher's switches, such as ordering=False or null_move=False, for
+          this searcher and the helpers alike.
+        """
+        self.memory = SharedMemory(create=True, size=table_bytes(hash_mb))
+        super().__init__(hash_mb, seed, table=TranspositionTable(hash_mb, self.memory.buf), **options)
+        self.options = options
+        self.hash_mb = hash_mb
+        self.seed = seed
+        self.workers = max(1, workers)
+        self.helpers = []
+        self.task_queues = []
+        self.results = None
+        self.stop_event = None
+        # Nodes the helpers searched in the last search
+        self.helper_nodes = 0
+        self.helper_depths = []
+        self._finalizer = weakref.finalize(self, _shutdown, self.helpers, self.task_queues, self.table,
+                                           self.memory)
+
+    def start_helpers(self):
+        """Start the helper processes if they are not running yet."""
+        if self.helpers or self.workers <= 1:
+            return
+        context = multiprocessing.get_context("spawn")
+        self.results = context.Queue()
+        self.stop_event = context.Event()
+        for index in range(1, self.workers):
+            tasks = context.Queue()
+            seed = self.seed + index if self.seed is not None else None
+            helper = context.Process(target=_helper_main, name=f"engine-helper-{index}", daemon=True,
+                                     args=(self.memory.name, self.hash_mb, seed, self.options, tasks,
+                                           self.results, self.stop_event))
+            helper.start()
+            self.helpers.append(helper)
+            self.task_queues.append(tasks)
+
+    def close(self):
+        """Stop the helper processes and free the shared table. The searcher cannot be used after."""
+        self._finalizer()
+
+    def new_game(self):
+        """Forget everything learned in earlier searches, in the helpers too."""
+        super().new_game()
+        for tasks in self.task_queues:
+            tasks.put("new_game")
+
+    def search(self, position, max_depth=MAX_DEPTH, time_limit=None, node_limit=None, token=None,
+               soft_limit=None):
+        """
+        Search a position with the helpers searching it alongside, see Searcher.search.
+        The limits apply to this process's search; the helpers stop when it does.
+
+        Returns:
+        - SearchResult: The main search's result, with the helpers' nodes added to nodes.
+        """
+        if self.workers <= 1:
+            return super().search(position, max_depth, time_limit, node_limit, token, soft_limit)
+        self.start_helpers()
+        self.stop_event.clear()
+        task = (position.copy(), max_depth, (self.table.generation + 1) % GENERATIONS)
+        for tasks in self.task_queues:
+            tasks.put(task)
+        try:
+            result = super().search(position, max_depth, time_limit, node_limit, token, soft_limit)
+        finally:
+            self.stop_event.set()
+            self.collect_helpers()
+        result.nodes += self.helper_nodes
+        return result
+
+    def collect_helpers(self):
+        """Wait for every helper to report its last search; restart them next time if one does not."""
+        self.helper_nodes = 0
+        self.helper_depths = []
+        for _ in self.helpers:
+            try:
+                nodes, depth = self.results.get(timeout=HELPER_STOP_TIMEOUT)
+            except queue.Empty:
+                # A helper died or hung; replace them all on the next search
+                _stop_helpers(self.helpers, self.task_queues)
+                return
+            self.helper_nodes += nodes
+            self.helper_depths.append(depth)
+
+    def stats(self):
+        """
+        Report counters from the last search, see Searcher.stats.
+
+        Returns:
+        - dict: Searcher.stats() plus the helpers' nodes and the depth each one reached.
+        """
+        stats = super().stats()
+        stats["helper_nodes"] = self.helper_nodes
+        stats["helper_depths"] = list(self.helper_depths)
+        return stats
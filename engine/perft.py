@@ -0,0 +1,218 @@
+"""
+Perft: count the leaf nodes of the legal move tree to a fixed depth.
+
+The counts for well-known positions are published, so any mistake in move
+generation (castling rights, en passant, promotions, pins) shows up as a
+wrong number, and the time taken measures move generation speed. divide()
+breaks the count down by root move to narrow a wrong count down to a move.
+
+Positions reached by different move orders can share a hash table of
+subtree counts, and root moves can be split across worker processes.
+
+    python -m engine.perft --depth 4
+    python -m engine.perft --fen "<fen>" --depth 3 --divide
+    python -m engine.perft --check --workers 4
+"""
+
+import argparse
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from engine.constants import START_FEN
+from engine.movegen import legal_moves
+from engine.moves import to_uci
+from engine.position import Position
+
+# (name, FEN, node counts for depth 1, 2, 3, ...)
+REFERENCE_POSITIONS = (
+    ("start", START_FEN, (20, 400, 8902, 197281, 4865609)),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     (48, 2039, 97862, 4085603)),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", (14, 191, 2812, 43238, 674624)),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     (6, 264, 9467, 422333)),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", (44, 1486, 62379, 2103487)),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     (46, 2079, 89890, 3894594)),
+)
+
+# Bytes per entry: 8 (key) + 8 (count) + 1 (depth)
+ENTRY_BYTES = 17
+
+
+class PerftTable:
+    def __init__(self, size_mb=16):
+        """
+        Initialize the PerftTable object, a direct-mapped table of subtree counts.
+
+        Parameters:
+        - size_mb (float): Memory budget for the table in megabytes.
+        """
+        self.entries = max(1, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.keys = array('Q', bytes(8 * self.entries))
+        self.counts = array('Q', bytes(8 * self.entries))
+        self.depths = array('B', bytes(self.entries))
+        self.hits = 0
+
+    def probe(self, key, depth):
+        """Return the stored count for a position searched to depth, or None."""
+        slot = key % self.entries
+        if self.keys[slot] == key and self.depths[slot] == depth:
+            self.hits += 1
+            return self.counts[slot]
+        return None
+
+    def store(self, key, depth, count):
+        """Store the count for a position searched to depth, replacing whatever was there."""
+        slot = key % self.entries
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.counts[slot] = count
+
+
+def perft(pos, depth, table=None):
+    """
+    Count the leaf nodes of the legal move tree.
+
+    Parameters:
+    - pos (Position): The position to count from. It is left as it was found.
+    - depth (int): Plies to look ahead.
+    - table (PerftTable): Optional table of subtree counts to share between transpositions.
+
+    Returns:
+    - int: The number of leaf nodes.
+    """
+    if depth == 0:
+        return 1
+    moves = legal_moves(pos)
+    if depth == 1:
+        # The moves themselves are the leaves
+        return len(moves)
+    if table is not None:
+        count = table.probe(pos.key, depth)
+        if count is not None:
+            return count
+
+    count = 0
+    for move in moves:
+        pos.make_move(move)
+        count += perft(pos, depth - 1, table)
+        pos.unmake_move()
+
+    if table is not None:
+        table.store(pos.key, depth, count)
+    return count
+
+
+def _perft_fen(fen, depth, hash_mb):
+    # Runs in a worker process, so it gets its own table
+    return perft(Position(fen), depth, PerftTable(hash_mb) if hash_mb else None)
+
+
+def divide(pos, depth, hash_mb=0, workers=1):
+    """
+    Count the leaf nodes under each root move.
+
+    Parameters:
+    - pos (Position): The position to count from.
+    - depth (int): Plies to look ahead, at least 1.
+    - hash_mb (float): Size of the subtree count table in megabytes, 0 for none.
+    - workers (int): Number of processes to split the root moves across.
+
+    Returns:
+    - dict: Leaf count for each root move, keyed by its UCI string, in generation order.
+    """
+    moves = legal_moves(pos)
+    children = []
+    for move in moves:
+        pos.make_move(move)
+        children.append(pos.fen())
+        pos.unmake_move()
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            counts = list(pool.map(_perft_fen, children, [depth - 1] * len(children),
+                                   [hash_mb] * len(children)))
+    else:
+        table = PerftTable(hash_mb) if hash_mb else None
+        counts = [perft(Position(fen), depth - 1, table) for fen in children]
+    return {to_uci(move): count for move, count in zip(moves, counts)}
+
+
+def run(fen, depth, hash_mb=0, workers=1):
+    """
+    Run perft on a position and time it.
+
+    Parameters:
+    - fen (str): The position in Forsyth-Edwards Notation.
+    - depth (int): Plies to look ahead.
+    - hash_mb (float): Size of the subtree count table in megabytes, 0 for none.
+    - workers (int): Number of processes to split the root moves across.
+
+    Returns:
+    - nodes (int): The number of leaf nodes.
+    - elapsed (float): Seconds taken.
+    - breakdown (dict): The divide() counts per root move.
+    """
+    start = time.perf_counter()
+    breakdown = divide(Position(fen), depth, hash_mb, workers) if depth > 0 else {}
+    nodes = sum(breakdown.values()) if depth > 0 else 1
+    return nodes, time.perf_counter() - start, breakdown
+
+
+def check_reference(max_depth=3, hash_mb=0, workers=1):
+    """
+    Compare perft counts against the published numbers for REFERENCE_POSITIONS.
+
+    Parameters:
+    - max_depth (int): Deepest depth to check for each position.
+    - hash_mb (float): Size of the subtree count table in megabytes, 0 for none.
+    - workers (int): Number of processes to split the root moves across.
+
+    Returns:
+    - list: (name, depth, expected, counted, elapsed) for every count checked.
+    """
+    results = []
+    for name, fen, expected_counts in REFERENCE_POSITIONS:
+        for depth, expected in enumerate(expected_counts[:max_depth], 1):
+            nodes, elapsed, _ = run(fen, depth, hash_mb, workers)
+            results.append((name, depth, expected, nodes, elapsed))
+    return results
+
+
+def _nps(nodes, elapsed):
+    return int(nodes / elapsed) if elapsed > 0 else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count legal move tree leaves to check and time move generation.")
+    parser.add_argument("--fen", default=START_FEN, help="position to count from (default: the start position)")
+    parser.add_argument("--depth", type=int, default=4, help="plies to look ahead, or the deepest depth with --check")
+    parser.add_argument("--divide", action="store_true", help="print the count under each root move")
+    parser.add_argument("--hash", type=float, default=0, help="subtree count table size in MB (default: off)")
+    parser.add_argument("--workers", type=int, default=1, help="processes to split the root moves across")
+    parser.add_argument("--check", action="store_true", help="check the reference positions instead")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = 0
+        for name, depth, expected, nodes, elapsed in check_reference(args.depth, args.hash, args.workers):
+            status = "ok" if nodes == expected else "FAIL"
+            failures += nodes != expected
+            print(f"{status:4} {name:12} depth {depth}  {nodes:>10} / {expected:<10} "
+                  f"{elapsed:7.2f}s {_nps(nodes, elapsed):>9} nps")
+        print("all counts match" if not failures else f"{failures} counts wrong")
+        return 1 if failures else 0
+
+    nodes, elapsed, breakdown = run(args.fen, args.depth, args.hash, args.workers)
+    if args.divide:
+        for move, count in breakdown.items():
+            print(f"{move}: {count}")
+        print()
+    print(f"nodes {nodes}  time {elapsed:.3f}s  nps {_nps(nodes, elapsed)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
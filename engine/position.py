@@ -0,0 +1,389 @@
+"""
+Position representation for the rules core.
+
+The Position holds everything needed to generate moves and play them: the
+pieces, the side to move, castling rights, the en passant square and the move
+clocks. It has no knowledge of sprites or the display.
+
+Pieces are kept twice: as one bitboard per piece code (plus an occupancy
+bitboard per color) for move generation, and as a 64 entry list so the piece
+on a given square can be read directly.
+
+Each side's attack map is kept with the position. It is built the first
+time it is asked for after a move and saved on the undo stack, so
+unmake_move gets it back for free and repeated check and castling queries
+are single bit tests.
+
+The Zobrist key of the position is kept in self.key and updated as moves are
+made, so the search can look positions up in a transposition table, along
+with self.pawn_key, the key of the pawns alone. In the
+same way self.material and self.psq hold each side's material and the
+piece-square balance, so the evaluation never has to scan the board.
+"""
+
+from engine.constants import (WHITE, BLACK, EMPTY, PAWN, KING, START_FEN, FEN_PIECES,
+                              WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE,
+                              make_piece, piece_color, piece_type, square_name, parse_square)
+from engine.evaluation import PSQ_TABLES, PIECE_MATERIAL
+from engine.movegen import attack_map, attackers_to
+from engine.zobrist import PIECE_KEYS, PAWN_KEYS, SIDE_KEY, CASTLING_KEYS, EP_KEYS, compute_key
+from engine.moves import (NULL_MOVE, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, EP_CAPTURE,
+                          from_square, to_square, move_flag, is_capture, is_promotion,
+                          promotion_type)
+
+# Castling rights that survive a move touching each square
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[0] = 15 & ~WHITE_QUEENSIDE
+CASTLING_MASK[7] = 15 & ~WHITE_KINGSIDE
+CASTLING_MASK[4] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[56] = 15 & ~BLACK_QUEENSIDE
+CASTLING_MASK[63] = 15 & ~BLACK_KINGSIDE
+CASTLING_MASK[60] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+
+# Rook origin and destination for each castle, keyed by the king's destination
+CASTLE_ROOK_SQUARES = {
+    6: (7, 5),
+    2: (0, 3),
+    62: (63, 61),
+    58: (56, 59),
+}
+
+FEN_CASTLING = (("K", WHITE_KINGSIDE), ("Q", WHITE_QUEENSIDE),
+                ("k", BLACK_KINGSIDE), ("q", BLACK_QUEENSIDE))
+
+
+class Position:
+    def __init__(self, fen=START_FEN):
+        """
+        Initialize a position from a FEN string.
+
+        Parameters:
+        - fen (str): The position in Forsyth-Edwards Notation. Defaults to the starting position.
+        """
+        self.squares = [EMPTY] * 64
+        self.bitboards = [0] * 15
+        self.occupied = [0, 0]
+        self.turn = WHITE
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.king_square = [None, None]
+        self.key = 0
+        self.pawn_key = 0
+        # Material per color and the piece-square balance from White's point of view
+        self.material = [0, 0]
+        self.psq = 0
+        # Undo stack of (move, captured piece, castling, en passant square, halfmove clock,
+        # attack maps, key, piece-square balance)
+        self.history = []
+        # Per color: None until computed, then the bitboard of squares that color attacks
+        self.attack_maps = [None, None]
+        self.set_fen(fen)
+
+    def set_fen(self, fen):
+        """
+        Replace the contents of the position with the given FEN string.
+
+        Parameters:
+        - fen (str): The position in Forsyth-Edwards Notation.
+        """
+        fields = fen.split()
+        placement = fields[0]
+        self.squares = [EMPTY] * 64
+        self.bitboards = [0] * 15
+        self.occupied = [0, 0]
+        self.king_square = [None, None]
+        self.material = [0, 0]
+        self.psq = 0
+        self.pawn_key = 0
+
+        row, col = 7, 0
+        for char in placement:
+            if char == "/":
+                row -= 1
+                col = 0
+            elif char.isdigit():
+                col += int(char)
+            else:
+                color = WHITE if char.isupper() else BLACK
+                self.put_piece(make_piece(color, FEN_PIECES[char.upper()]), row * 8 + col)
+                col += 1
+
+        self.turn = WHITE if len(fields) < 2 or fields[1] == "w" else BLACK
+
+        self.castling = 0
+        if len(fields) > 2:
+            for letter, right in FEN_CASTLING:
+                if letter in fields[2]:
+                    self.castling |= right
+
+        self.ep_square = None
+        if len(fields) > 3 and fields[3] != "-":
+            self.ep_square = parse_square(fields[3])
+
+        self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        self.history = []
+        self.attack_maps = [None, None]
+        self.key = compute_key(self)
+
+    def fen(self):
+        """
+        Export the position as a FEN string.
+
+        Returns:
+        - str: The position in Forsyth-Edwards Notation.
+        """
+        rows = []
+        for row in range(7, -1, -1):
+            text = ""
+            empty = 0
+            for col in range(8):
+                piece = self.squares[row * 8 + col]
+                if piece == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                letter = " PNBRQK"[piece_type(piece)]
+                text += letter if piece_color(piece) == WHITE else letter.lower()
+            if empty:
+                text += str(empty)
+            rows.append(text)
+
+        castling = "".join(letter for letter, right in FEN_CASTLING if self.castling & right) or "-"
+        ep = square_name(self.ep_square) if self.ep_square is not None else "-"
+        turn = "w" if self.turn == WHITE else "b"
+        return f"{'/'.join(rows)} {turn} {castling} {ep} {self.halfmove_clock} {self.fullmove_number}"
+
+    def copy(self):
+        """
+        Return an independent copy of the position.
+
+        Returns:
+        - Position: The copied position.
+        """
+        other = Position.__new__(Position)
+        other.squares = self.squares[:]
+        other.bitboards = self.bitboards[:]
+        other.occupied = self.occupied[:]
+        other.turn = self.turn
+        other.castling = self.castling
+        other.ep_square = self.ep_square
+        other.halfmove_clock = self.halfmove_clock
+        other.fullmove_number = self.fullmove_number
+        other.king_square = self.king_square[:]
+        other.history = self.history[:]
+        other.attack_maps = self.attack_maps[:]
+        other.key = self.key
+        other.pawn_key = self.pawn_key
+        other.material = self.material[:]
+        other.psq = self.psq
+        return other
+
+    def piece_at(self, sq):
+        """Return the piece code on a square, or EMPTY."""
+        return self.squares[sq]
+
+    def pieces(self, color, kind):
+        """Return the bitboard of one color's pieces of one type."""
+        return self.bitboards[kind | (color << 3)]
+
+    def attacked_by(self, color):
+        """
+        Return the bitboard of squares attacked by a color, with the other king
+        treated as absent so squares behind it on a checking ray are included.
+
+        Parameters:
+        - color (int): The attacking color.
+
+        Returns:
+        - int: The attacked squares.
+        """
+        attacked = self.attack_maps[color]
+        if attacked is None:
+            attacked = self.attack_maps[color] = attack_map(self, color)
+        return attacked
+
+    def is_draw(self):
+        """
+        Return True if the position is drawn by the fifty-move rule or because it has
+        already occurred with the same side to move since the last capture or pawn move.
+        """
+        if self.halfmove_clock >= 100:
+            return True
+        history = self.history
+        # Only positions since the last irreversible move can repeat, and only every other ply
+        for back in range(2, min(self.halfmove_clock, len(history)) + 1, 2):
+            if history[-back][6] == self.key:
+                return True
+        return False
+
+    def in_check(self):
+        """Return True if the side to move is in check."""
+        us = self.turn
+        attacked = self.attack_maps[us ^ 1]
+        if attacked is not None:
+            return bool(attacked >> self.king_square[us] & 1)
+        # Only the king's square matters, so the attack map is left to be built when needed
+        return attackers_to(self, self.king_square[us], us ^ 1) != 0
+
+    @property
+    def all_occupied(self):
+        """Bitboard of every occupied square."""
+        return self.occupied[0] | self.occupied[1]
+
+    def put_piece(self, piece, sq):
+        self.key ^= PIECE_KEYS[piece][sq]
+        self.pawn_key ^= PAWN_KEYS[piece][sq]
+        self.material[piece >> 3] += PIECE_MATERIAL[piece]
+        self.psq += PSQ_TABLES[piece][sq]
+        self.squares[sq] = piece
+        self.bitboards[piece] |= 1 << sq
+        self.occupied[piece >> 3] |= 1 << sq
+        if piece & 7 == KING:
+            self.king_square[piece >> 3] = sq
+
+    def remove_piece(self, sq):
+        piece = self.squares[sq]
+        self.key ^= PIECE_KEYS[piece][sq]
+        self.pawn_key ^= PAWN_KEYS[piece][sq]
+        self.material[piece >> 3] -= PIECE_MATERIAL[piece]
+        self.psq -= PSQ_TABLES[piece][sq]
+        self.squares[sq] = EMPTY
+        self.bitboards[piece] ^= 1 << sq
+        self.occupied[piece >> 3] ^= 1 << sq
+        return piece
+
+    def make_move(self, move):
+        """
+        Play a move on the position and push the state needed to take it back onto the
+        undo stack. The move is assumed to be pseudo-legal.
+
+        Parameters:
+        - move (int): The encoded move.
+        """
+        from_sq = from_square(move)
+        to_sq = to_square(move)
+        flag = move_flag(move)
+        us = self.turn
+        key_before = self.key
+        psq_before = self.psq
+
+        captured = EMPTY
+        if flag == EP_CAPTURE:
+            captured = self.remove_piece(to_sq - 8 if us == WHITE else to_sq + 8)
+        elif is_capture(move):
+            captured = self.remove_piece(to_sq)
+
+        self.history.append((move, captured, self.castling, self.ep_square, self.halfmove_clock,
+                             self.attack_maps, key_before, psq_before))
+        self.attack_maps = [None, None]
+
+        piece = self.remove_piece(from_sq)
+        if piece & 7 == PAWN or captured:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+
+        if is_promotion(move):
+            piece = make_piece(us, promotion_type(move))
+        self.put_piece(piece, to_sq)
+
+        if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+            rook_from, rook_to = CASTLE_ROOK_SQUARES[to_sq]
+            self.put_piece(self.remove_piece(rook_from), rook_to)
+
+        key = self.key ^ CASTLING_KEYS[self.castling] ^ SIDE_KEY
+        if self.ep_square is not None:
+            key ^= EP_KEYS[self.ep_square & 7]
+
+        self.castling &= CASTLING_MASK[from_sq] & CASTLING_MASK[to_sq]
+        self.ep_square = (from_sq + to_sq) // 2 if flag == DOUBLE_PUSH else None
+
+        key ^= CASTLING_KEYS[self.castling]
+        if self.ep_square is not None:
+            key ^= EP_KEYS[self.ep_square & 7]
+        self.key = key
+
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.turn = us ^ 1
+
+    def unmake_move(self):
+        """
+        Take back the last move played with make_move, restoring the position exactly.
+
+        Returns:
+        - int: The move that was taken back.
+        """
+        (move, captured, castling, ep_square, halfmove_clock, self.attack_maps, key,
+         psq) = self.history.pop()
+        from_sq = from_square(move)
+        to_sq = to_square(move)
+        flag = move_flag(move)
+        us = self.turn ^ 1
+
+        if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+            rook_from, rook_to = CASTLE_ROOK_SQUARES[to_sq]
+            self.put_piece(self.remove_piece(rook_to), rook_from)
+
+        piece = self.remove_piece(to_sq)
+        if is_promotion(move):
+            piece = make_piece(us, PAWN)
+        self.put_piece(piece, from_sq)
+
+        if flag == EP_CAPTURE:
+            self.put_piece(captured, to_sq - 8 if us == WHITE else to_sq + 8)
+        elif captured:
+            self.put_piece(captured, to_sq)
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.key = key
+        # Restored rather than trusted to the put/remove arithmetic, which drifts in floats
+        self.psq = psq
+        if us == BLACK:
+            self.fullmove_number -= 1
+        self.turn = us
+        return move
+
+    def make_null_move(self):
+        """
+        Pass the turn without moving, for null-move pruning in the search. Must not be
+        played while in check. The halfmove clock is reset, so positions on either side
+        of the null move are never taken for repetitions of each other.
+        """
+        self.history.append((NULL_MOVE, EMPTY, self.castling, self.ep_square, self.halfmove_clock,
+                             self.attack_maps, self.key, self.psq))
+        # The pieces have not moved, so both attack maps stay valid
+        key = self.key ^ SIDE_KEY
+        if self.ep_square is not None:
+            key ^= EP_KEYS[self.ep_square & 7]
+            self.ep_square = None
+        self.key = key
+        self.halfmove_clock = 0
+        if self.turn == BLACK:
+            self.fullmove_number += 1
+        self.turn ^= 1
+
+    def unmake_null_move(self):
+        """Take back a null move played with make_null_move."""
+        _, _, _, self.ep_square, self.halfmove_clock, self.attack_maps, self.key, _ = self.history.pop()
+        self.turn ^= 1
+        if self.turn == BLACK:
+            self.fullmove_number -= 1
+
+    def __repr__(self):
+        rows = []
+        for row in range(7, -1, -1):
+            text = ""
+            for col in range(8):
+                piece = self.squares[row * 8 + col]
+                letter = " PNBRQK"[piece_type(piece)] if piece else "."
+                text += letter if piece == EMPTY or piece_color(piece) == WHITE else letter.lower()
+            rows.append(text)
+        return "\n".join(rows)
@@ -0,0 +1,801 @@
+"""
+Search for the computer player.
+
+Searcher runs a negamax alpha-beta search with iterative deepening: it
+searches to depth 1, 2, 3 and so on, and the result of the last iteration
+that finished is always available. Time and node limits are checked as the
+search runs; when one is hit the unfinished iteration is abandoned and the
+previous one's result is returned.
+
+A Searcher is meant to be kept for a whole game. The transposition table,
+the history scores and the last principal variation carry over from one
+search to the next, so the work done while thinking about the previous move
+is reused; new_game() forgets them.
+
+At the horizon the main search hands over to a quiescence search that only
+plays captures and promotions, so a leaf is never scored in the middle of an
+exchange.
+
+The search is selective, and each technique can be switched off on its own
+to measure it: null-move pruning, late-move reductions, futility pruning and
+razoring near the horizon, and extending moves that give check.
+
+It is also a principal variation search: only the first move at a node gets
+the full window, and the rest are searched with a null window that can only
+show they are no better, and are searched again only when one is. Each
+iteration starts with an aspiration window around the previous iteration's
+score, widened when the score falls outside it.
+
+The inner loop allocates as little as it can. Each ply has a move list that
+is emptied and refilled at every node searched there rather than a new list
+per node, and the move generator hands out ints from a prebuilt table. The
+objects that exist when a search starts are frozen out of the garbage
+collector until it ends, so the collections the search triggers only look at
+what it allocated, not at the rest of the program's heap. The freeze is
+process-wide, so it is counted: the heap is unfrozen when the last of the
+searches running in the process ends. Worker and helper processes, which do
+nothing but search, switch the collector off instead.
+"""
+
+import gc
+import random
+import threading
+import time
+
+from engine.constants import PIECE_VALUES, PAWN, QUEEN, KING, MAX_PLY
+from engine.evaluation import Evaluator, EVAL_CACHE_ENTRIES, PAWN_TABLE_ENTRIES
+from engine.movegen import legal_moves
+from engine.moves import NULL_MOVE, EP_CAPTURE, is_capture, is_promotion, promotion_type
+from engine.ordering import MoveOrderer
+from engine.see import see
+from engine.transposition import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+
+INFINITY = 1000000
+MATE_SCORE = 100000
+# Scores beyond this are mates, stored in the table relative to the node they were found at
+MATE_BOUND = MATE_SCORE - 1000
+MAX_DEPTH = 64
+
+# How many nodes to search between checks of the time limit
+CHECK_INTERVAL = 1024
+
+# With a soft time limit, a new iteration is only started while less than this share of
+# it is used, since an iteration usually takes longer than all the earlier ones together
+NEW_ITERATION_SHARE = 0.5
+# The soft limit is scaled by this once the best move has held for STABLE_ITERATIONS
+# iterations, and by UNSTABLE_SCALE in an iteration where it changed
+STABLE_ITERATIONS = 3
+STABLE_SCALE = 0.5
+UNSTABLE_SCALE = 1.5
+
+# Captures that cannot lift the score to within this margin of alpha are skipped
+DELTA_MARGIN = 20
+# Most quiescence nodes searched below a single leaf of the main search
+QSEARCH_NODE_LIMIT = 2000
+
+# Null-move pruning: the null move is searched this many plies shallower, one more from
+# NULL_MOVE_DEEP_DEPTH, and only from NULL_MOVE_MIN_DEPTH up
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_DEEP_DEPTH = 6
+NULL_MOVE_MIN_DEPTH = 3
+
+# Late-move reductions: quiet moves from this index in the ordered list are searched a ply
+# shallower, and a second ply shallower from LMR_DEEP_INDEX at LMR_DEEP_DEPTH or more
+LMR_MIN_DEPTH = 3
+LMR_MIN_INDEX = 3
+LMR_DEEP_INDEX = 8
+LMR_DEEP_DEPTH = 6
+
+# Futility pruning: at these remaining depths quiet moves are skipped when the static
+# evaluation plus the margin cannot reach alpha
+FUTILITY_MARGINS = (0, 20, 50)
+# Razoring: at these remaining depths a static evaluation this far below alpha drops
+# straight into the quiescence search
+RAZOR_MARGINS = (0, 30, 50)
+
+# Aspiration windows: iterations from this depth start with a window this wide on either
+# side of the previous score, doubled on every fail until it passes ASPIRATION_MAX
+ASPIRATION_MIN_DEPTH = 3
+ASPIRATION_WINDOW = 5
+ASPIRATION_MAX = 200
+
+# Search techniques that can be switched off, each a Searcher attribute and constructor argument
+SEARCH_FEATURES = ("null_move", "lmr", "futility", "razoring", "check_extensions", "pvs", "aspiration", "see",
+                   "eval_cache", "pawn_hash")
+
+
+# Searches running in this process with the heap frozen, see freeze_heap()
+_freeze_lock = threading.Lock()
+_frozen_searches = 0
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when a time or node limit is reached."""
+
+
+class SearchResult:
+    def __init__(self, best_move, score, depth, pv, nodes, elapsed):
+        """
+        Initialize the SearchResult object.
+
+        Parameters:
+        - best_move (int): The best move found, or 0 if there are no legal moves.
+        - score (float): The score of the best move from the mover's point of view.
+        - depth (int): The depth of the last completed iteration.
+        - pv (list): The principal variation, starting with best_move.
+        - nodes (int): Nodes searched.
+        - elapsed (float): Seconds spent searching.
+        """
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.pv = pv
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (f"SearchResult(best_move={self.best_move}, score={self.score}, depth={self.depth}, "
+                f"nodes={self.nodes}, elapsed={self.elapsed:.3f})")
+
+
+def freeze_heap():
+    """
+    Freeze every object that exists now out of the garbage collector, for a search
+    that is starting. Each call must be matched by a call to thaw_heap().
+    """
+    global _frozen_searches
+    with _freeze_lock:
+        gc.freeze()
+        _frozen_searches += 1
+
+
+def thaw_heap():
+    """Undo a freeze_heap() call, unfreezing the heap once no other search holds it frozen."""
+    global _frozen_searches
+    with _freeze_lock:
+        _frozen_searches -= 1
+        if not _frozen_searches:
+            gc.unfreeze()
+
+
+def score_to_table(score, ply):
+    """Convert a mate score from 'mate in n from the root' to 'mate in n from this node'."""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """Convert a stored mate score back to being relative to the root."""
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class Searcher:
+    def __init__(self, hash_mb=16, seed=None, ordering=True, quiescence=True, table=None, null_move=True,
+                 lmr=True, futility=True, razoring=True, check_extensions=True, pvs=True, aspiration=True,
+                 see=True, eval_cache=True, pawn_hash=True):
+        """
+        Initialize the Searcher object.
+
+        Parameters:
+        - hash_mb (float): Memory budget for the transposition table in megabytes.
+        - seed (int): Seed for breaking ties between equally good root moves. None picks
+          a different order every game.
+        - ordering (bool): Sort moves with MVV-LVA, killers and history. When False only
+          the hash move is moved to the front, which is useful to measure the gain.
+        - quiescence (bool): Resolve captures at the leaves. When False leaves are scored
+          by the static evaluation.
+        - table (TranspositionTable): A table to search with instead of a new one of
+          hash_mb megabytes, such as one shared with other processes.
+        - null_move (bool): Prune nodes where passing the turn still fails high.
+        - lmr (bool): Search late quiet moves shallower, and again at full depth only if
+          they beat alpha.
+        - futility (bool): Skip quiet moves near the horizon that cannot reach alpha.
+        - razoring (bool): Drop into the quiescence search near the horizon when the
+          static evaluation is far below alpha.
+        - check_extensions (bool): Search moves that give check a ply deeper.
+        - pvs (bool): Search every move after the first with a null window first.
+        - aspiration (bool): Start each iteration with a narrow window around the last score.
+        - see (bool): Use the static exchange evaluation to order captures and to skip
+          losing ones in the quiescence search.
+        - eval_cache (bool): Keep evaluations in a cache of EVAL_CACHE_ENTRIES entries.
+        - pawn_hash (bool): Keep pawn structure scores in a table of PAWN_TABLE_ENTRIES entries.
+        """
+        self.table = table if table is not None else TranspositionTable(hash_mb)
+        self.orderer = MoveOrderer()
+        self.ordering = ordering
+        self.quiescence = quiescence
+        self.null_move = null_move
+        self.lmr = lmr
+        self.futility = futility
+        self.razoring = razoring
+        self.check_extensions = check_extensions
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.see = see
+        self.eval_cache = eval_cache
+        self.pawn_hash = pawn_hash
+        self.evaluator = Evaluator(EVAL_CACHE_ENTRIES if eval_cache else 0, PAWN_TABLE_ENTRIES if pawn_hash else 0)
+        self.rng = random.Random(seed)
+        self.nodes = 0
+        self.qnodes = 0
+        self.qnode_budget = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # How often each selective technique applied in the last search
+        self.null_cutoffs = 0
+        self.reductions = 0
+        self.re_searches = 0
+        self.futility_prunes = 0
+        self.razor_prunes = 0
+        self.extensions = 0
+        # Null-window searches that had to be repeated, and aspiration windows failed
+        self.pvs_re_searches = 0
+        self.fail_lows = 0
+        self.fail_highs = 0
+        self.see_prunes = 0
+        self.root_depth = 0
+        self.deadline = None
+        self.node_limit = None
+        self.stopped = False
+        self.token = None
+        self.start_time = 0.0
+        self.soft_limit = None
+        # The result of the deepest iteration finished so far, for progress reports
+        self.progress = None
+        self.last_pv = []
+        # One move list per ply, refilled at every node searched at that ply
+        self.move_stack = [[] for _ in range(MAX_PLY)]
+
+    def new_game(self):
+        """Forget everything learned in earlier searches."""
+        self.table.clear()
+        self.orderer.clear()
+        self.last_pv = []
+
+    def expected_move(self, pos):
+        """
+        Return the move the last principal variation predicted for this position, if the
+        two moves played since the last search (ours and the reply) followed it.
+
+        Parameters:
+        - pos (Position): The position about to be searched.
+
+        Returns:
+        - int: The predicted move, or 0.
+        """
+        pv = self.last_pv
+        history = pos.history
+        if len(pv) > 2 and len(history) >= 2 and history[-2][0] == pv[0] and history[-1][0] == pv[1]:
+            return pv[2]
+        return 0
+
+    def static_eval(self, pos):
+        """Score a position from the side to move's point of view."""
+        score = self.evaluator.evaluate(pos)
+        return score if pos.turn == 0 else -score
+
+    def check_limits(self):
+        if self.stopped:
+            raise SearchAborted
+        if self.token is not None and self.token.cancelled:
+            self.stopped = True
+            raise SearchAborted
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.stopped = True
+            raise SearchAborted
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+            raise SearchAborted
+
+    def stats(self):
+        """
+        Report counters from the last search.
+
+        Returns:
+        - dict: Nodes (quiescence nodes included) and quiescence nodes, beta cutoffs, the
+          share of cutoffs made by the first move searched, how often each selective
+          technique applied, null-window re-searches, aspiration window fails, and the
+          evaluation cache, pawn table and transposition table statistics.
+        """
+        return {
+            "nodes": self.nodes,
+            "qnodes": self.qnodes,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            "null_cutoffs": self.null_cutoffs,
+            "reductions": self.reductions,
+            "re_searches": self.re_searches,
+            "futility_prunes": self.futility_prunes,
+            "razor_prunes": self.razor_prunes,
+            "extensions": self.extensions,
+            "pvs_re_searches": self.pvs_re_searches,
+            "aspiration_fail_lows": self.fail_lows,
+            "aspiration_fail_highs": self.fail_highs,
+            "see_prunes": self.see_prunes,
+            "evaluation": self.evaluator.stats(),
+            "table": self.table.stats(),
+        }
+
+    def stop(self):
+        """Ask a running search to stop at its next limit check."""
+        self.stopped = True
+
+    def ponderhit(self, time_limit=None, soft_limit=None):
+        """
+        Give time limits to a search that was started without any, such as a ponder search
+        whose expected move has just been played. Can be called from another thread.
+
+        The hard limit counts from now. The soft limit counts from when the search
+        started, so time spent pondering is not spent twice; if that time already covers
+        the soft limit, the search stops straight away with its deepest finished iteration.
+
+        Parameters:
+        - time_limit (float): Seconds from now after which to stop, or None for no limit.
+        - soft_limit (float): Seconds the whole search should normally take, or None.
+        """
+        now = time.perf_counter()
+        self.soft_limit = soft_limit
+        self.deadline = now + time_limit if time_limit is not None else None
+        if (soft_limit is not None and self.progress is not None
+                and now - self.start_time >= soft_limit * NEW_ITERATION_SHARE):
+            self.stop()
+
+    def search(self, position, max_depth=MAX_DEPTH, time_limit=None, node_limit=None, token=None,
+               soft_limit=None):
+        """
+        Search a position with iterative deepening.
+
+        Parameters:
+        - position (Position): The position to search. It is copied, never modified.
+        - max_depth (int): The deepest iteration to run.
+        - time_limit (float): Seconds after which to stop, or None for no limit.
+        - node_limit (int): Nodes after which to stop, or None for no limit.
+        - token (CancellationToken): Stops the search when cancelled, or None.
+        - soft_limit (float): Seconds the search should normally take, or None. No new
+          iteration is started once most of it is used, and less of it is used while the
+          best move stays the same.
+
+        Returns:
+        - SearchResult: The result of the deepest completed iteration.
+        """
+        start = time.perf_counter()
+        pos = position.copy()
+        self.table.new_search()
+        self.evaluator.reset_stats()
+        self.orderer.age()
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_cutoffs = 0
+        self.reductions = 0
+        self.re_searches = 0
+        self.futility_prunes = 0
+        self.razor_prunes = 0
+        self.extensions = 0
+        self.pvs_re_searches = 0
+        self.fail_lows = 0
+        self.fail_highs = 0
+        self.see_prunes = 0
+        self.stopped = False
+        self.deadline = start + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.token = token
+        self.start_time = start
+        self.soft_limit = soft_limit
+        self.progress = None
+
+        # Collections during the search skip everything that already existed; unfreezing
+        # afterwards lets the collector reach those objects again
+        freeze_heap()
+        try:
+            return self.iterate(pos, max_depth, start)
+        finally:
+            thaw_heap()
+
+    def iterate(self, pos, max_depth, start):
+        """
+        Run the iterations of a search set up by search().
+
+        Parameters:
+        - pos (Position): The searcher's own copy of the position.
+        - max_depth (int): The deepest iteration to run.
+        - start (float): When the search started, from time.perf_counter().
+
+        Returns:
+        - SearchResult: The result of the deepest completed iteration.
+        """
+        root_moves = legal_moves(pos)
+        # Shuffle once so that ties between equal moves are broken at random; the sort
+        # below is stable so equally scored moves keep their shuffled order
+        self.rng.shuffle(root_moves)
+        hash_move = self.table.best_move(pos.key) or self.expected_move(pos)
+        if self.ordering:
+            self.orderer.order(pos, root_moves, hash_move, 0, self.see)
+        elif hash_move in root_moves:
+            root_moves.remove(hash_move)
+            root_moves.insert(0, hash_move)
+        result = SearchResult(root_moves[0] if root_moves else 0, 0, 0, [], 0, 0.0)
+        if len(root_moves) <= 1:
+            result.pv = self.last_pv = root_moves[:1]
+            return result
+
+        stable = 0
+        for depth in range(1, max_depth + 1):
+            try:
+                best_move, score = self.search_iteration(pos, root_moves, depth, result)
+            except SearchAborted:
+                break
+            stable = stable + 1 if best_move == result.best_move else 0
+            # Search the best move first in the next iteration
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+            result = SearchResult(best_move, score, depth, self.principal_variation(pos, best_move, depth),
+                                  self.nodes, time.perf_counter() - start)
+            self.progress = result
+            if abs(score) > MATE_BOUND:
+                break
+            # Read from self, since ponderhit() may set it while the search runs
+            if self.soft_limit is not None:
+                scale = STABLE_SCALE if stable >= STABLE_ITERATIONS else UNSTABLE_SCALE if not stable else 1
+                if result.elapsed >= self.soft_limit * scale * NEW_ITERATION_SHARE:
+                    break
+
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        self.last_pv = result.pv
+        return result
+
+    def search_iteration(self, pos, root_moves, depth, previous):
+        """
+        Search the root to one depth, in an aspiration window around the previous
+        iteration's score when there is one, widening it until the score falls inside.
+
+        Parameters:
+        - pos (Position): The root position.
+        - root_moves (list): The legal moves, best first; reordered when a window fails high.
+        - depth (int): The depth of this iteration.
+        - previous (SearchResult): The last iteration's result.
+
+        Returns:
+        - best_move (int): The best move found.
+        - score (float): Its score.
+        """
+        if (not self.aspiration or depth < ASPIRATION_MIN_DEPTH or not previous.depth
+                or abs(previous.score) > MATE_BOUND):
+            return self.search_root(pos, root_moves, depth, -INFINITY, INFINITY)
+
+        window = ASPIRATION_WINDOW
+        alpha = previous.score - window
+        beta = previous.score + window
+        while True:
+            best_move, score = self.search_root(pos, root_moves, depth, alpha, beta)
+            if alpha < score < beta:
+                return best_move, score
+            window *= 2
+            if score <= alpha:
+                self.fail_lows += 1
+                alpha = score - window if window <= ASPIRATION_MAX else -INFINITY
+            else:
+                self.fail_highs += 1
+                beta = score + window if window <= ASPIRATION_MAX else INFINITY
+                # The move that failed high is the one to search first next time
+                root_moves.remove(best_move)
+                root_moves.insert(0, best_move)
+
+    def search_root(self, pos, root_moves, depth, alpha, beta):
+        alpha_start = alpha
+        best_score = -INFINITY
+        best_move = root_moves[0]
+        self.root_depth = depth
+        for index, move in enumerate(root_moves):
+            pos.make_move(move)
+            new_depth = depth - 1 + self.extension(pos, 1)
+            if index and self.pvs:
+                score = -self.negamax(pos, new_depth, -alpha - 1, -alpha, 1)
+                if alpha < score < beta:
+                    self.pvs_re_searches += 1
+                    score = -self.negamax(pos, new_depth, -beta, -alpha, 1)
+            else:
+                score = -self.negamax(pos, new_depth, -beta, -alpha, 1)
+            pos.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score >= beta:
+            bound = BOUND_LOWER
+        elif best_score > alpha_start:
+            bound = BOUND_EXACT
+        else:
+            bound = BOUND_UPPER
+        self.table.store(pos.key, best_move, depth, bound, score_to_table(best_score, 0))
+        return best_move, best_score
+
+    def negamax(self, pos, depth, alpha, beta, ply):
+        """
+        Alpha-beta search in negamax form.
+
+        Parameters:
+        - pos (Position): The search position.
+        - depth (int): Remaining depth in plies.
+        - alpha (float): Lower bound of the search window.
+        - beta (float): Upper bound of the search window.
+        - ply (int): Distance from the root.
+
+        Returns:
+        - float: The score from the side to move's point of view.
+        """
+        if depth <= 0 and self.quiescence:
+            self.qnode_budget = self.qnodes + QSEARCH_NODE_LIMIT
+            return self.qsearch(pos, alpha, beta, ply)
+
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self.check_limits()
+
+        if pos.is_draw():
+            return 0
+
+        key = pos.key
+        alpha_start = alpha
+        hash_move = 0
+        entry = self.table.probe(key)
+        if entry is not None:
+            hash_move, entry_depth, bound, score = entry
+            if entry_depth >= depth:
+                score = score_from_table(score, ply)
+                if (bound == BOUND_EXACT or (bound == BOUND_LOWER and score >= beta)
+                        or (bound == BOUND_UPPER and score <= alpha)):
+                    return score
+
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self.static_eval(pos)
+
+        in_check = pos.in_check()
+        static = self.static_eval(pos) if not in_check else -INFINITY
+        # Near-mate windows need every move searched
+        quiet_window = abs(alpha) < MATE_BOUND and abs(beta) < MATE_BOUND
+
+        if (self.razoring and self.quiescence and not in_check and quiet_window and depth < len(RAZOR_MARGINS)
+                and not hash_move and static + RAZOR_MARGINS[depth] <= alpha):
+            # Razoring: far below alpha with little depth left, so only captures can save it
+            razor_alpha = alpha - RAZOR_MARGINS[depth]
+            self.qnode_budget = self.qnodes + QSEARCH_NODE_LIMIT
+            score = self.qsearch(pos, razor_alpha, razor_alpha + 1, ply)
+            if score <= razor_alpha:
+                self.razor_prunes += 1
+                return score
+
+        if (self.null_move and not in_check and quiet_window and depth >= NULL_MOVE_MIN_DEPTH
+                and static >= beta and pos.history and pos.history[-1][0] != NULL_MOVE
+                and self.has_pieces(pos)):
+            # Null-move pruning: if passing still fails high, a real move would too
+            reduction = NULL_MOVE_REDUCTION + (depth >= NULL_MOVE_DEEP_DEPTH)
+            pos.make_null_move()
+            score = -self.negamax(pos, depth - 1 - reduction, -beta, -beta + 1, ply + 1)
+            pos.unmake_null_move()
+            if score >= beta:
+                self.null_cutoffs += 1
+                return beta if score > MATE_BOUND else score
+
+        moves = self.move_stack[ply]
+        moves.clear()
+        if not legal_moves(pos, False, moves):
+            return -MATE_SCORE + ply if in_check else 0
+
+        if self.ordering:
+            self.orderer.order(pos, moves, hash_move, ply, self.see)
+        elif hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+
+        # Futility pruning: a quiet move cannot lift a hopeless frontier node to alpha
+        futile = (self.futility and not in_check and quiet_window and depth < len(FUTILITY_MARGINS)
+                  and static + FUTILITY_MARGINS[depth] <= alpha)
+
+        best_score = -INFINITY
+        best_move = 0
+        for index, move in enumerate(moves):
+            quiet = not is_capture(move) and not is_promotion(move)
+            pos.make_move(move)
+            extension = self.extension(pos, ply + 1)
+            if futile and index > 0 and quiet and not extension:
+                pos.unmake_move()
+                self.futility_prunes += 1
+                continue
+            new_depth = depth - 1 + extension
+            if (self.lmr and quiet and not in_check and not extension and depth >= LMR_MIN_DEPTH
+                    and index >= LMR_MIN_INDEX and not self.orderer.is_killer(move, ply)):
+                # Late-move reduction: a late quiet move is unlikely to be best, so prove it
+                # cannot beat alpha with a shallower null-window search
+                reduction = 1 + (index >= LMR_DEEP_INDEX and depth >= LMR_DEEP_DEPTH)
+                self.reductions += 1
+                score = -self.negamax(pos, new_depth - reduction, -alpha - 1, -alpha, ply + 1)
+                if score > alpha:
+                    self.re_searches += 1
+                    score = self.search_move(pos, new_depth, alpha, beta, ply, index)
+            else:
+                score = self.search_move(pos, new_depth, alpha, beta, ply, index)
+            pos.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        if index == 0:
+                            self.first_move_cutoffs += 1
+                        self.orderer.record_cutoff(pos, move, depth, ply)
+                        break
+
+        if best_score >= beta:
+            bound = BOUND_LOWER
+        elif best_score > alpha_start:
+            bound = BOUND_EXACT
+        else:
+            bound = BOUND_UPPER
+        self.table.store(key, best_move, depth, bound, score_to_table(best_score, ply))
+        return best_score
+
+    def search_move(self, pos, depth, alpha, beta, ply, index):
+        """
+        Search the position after a move: the first move of a node with the full window,
+        later ones with a null window first, and again with the full window only if the
+        null window shows the move beats alpha.
+
+        Parameters:
+        - pos (Position): The position after the move.
+        - depth (int): Remaining depth for it.
+        - alpha (float): The node's lower bound.
+        - beta (float): The node's upper bound.
+        - ply (int): Distance of the node the move is played from to the root.
+        - index (int): The move's place in the node's ordered move list.
+
+        Returns:
+        - float: The move's score from the node's point of view.
+        """
+        if index and self.pvs:
+            score = -self.negamax(pos, depth, -alpha - 1, -alpha, ply + 1)
+            if not alpha < score < beta:
+                return score
+            self.pvs_re_searches += 1
+        return -self.negamax(pos, depth, -beta, -alpha, ply + 1)
+
+    def extension(self, pos, ply):
+        """
+        Return the plies to extend the move just played by: one if it gives check, while
+        the line is less than twice the iteration's depth long.
+
+        Parameters:
+        - pos (Position): The position after the move.
+        - ply (int): Distance of that position from the root.
+
+        Returns:
+        - int: 1 or 0.
+        """
+        if self.check_extensions and ply < 2 * self.root_depth and pos.in_check():
+            self.extensions += 1
+            return 1
+        return 0
+
+    def has_pieces(self, pos):
+        """
+        Return True if the side to move has a piece besides pawns and its king. Without
+        one zugzwang is common, and there passing is better than any move, so a null
+        move proves nothing.
+        """
+        us = pos.turn
+        return bool(pos.occupied[us] & ~(pos.bitboards[PAWN | us << 3] | pos.bitboards[KING | us << 3]))
+
+    def qsearch(self, pos, alpha, beta, ply):
+        """
+        Quiescence search: only captures and promotions are played, until the position
+        is quiet. The side to move may stand pat on the static evaluation instead of
+        capturing; when in check every evasion is searched instead.
+
+        Parameters:
+        - pos (Position): The search position.
+        - alpha (float): Lower bound of the search window.
+        - beta (float): Upper bound of the search window.
+        - ply (int): Distance from the root.
+
+        Returns:
+        - float: The score from the side to move's point of view.
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self.check_limits()
+
+        in_check = pos.in_check()
+        moves = self.move_stack[ply]
+        moves.clear()
+        if in_check:
+            stand_pat = -INFINITY
+            if not legal_moves(pos, False, moves):
+                return -MATE_SCORE + ply
+        else:
+            stand_pat = self.static_eval(pos)
+            if stand_pat >= beta:
+                return stand_pat
+            # Even winning a queen would not reach alpha
+            if stand_pat + PIECE_VALUES[QUEEN] * 2 + DELTA_MARGIN < alpha:
+                return stand_pat
+            legal_moves(pos, True, moves)
+
+        if ply >= MAX_PLY - 1 or self.qnodes >= self.qnode_budget:
+            return stand_pat if not in_check else self.static_eval(pos)
+
+        if stand_pat > alpha:
+            alpha = stand_pat
+        best_score = stand_pat
+        # Losing captures are skipped below rather than ordered last
+        self.orderer.order(pos, moves, 0, ply, False)
+
+        squares = pos.squares
+        for move in moves:
+            if not in_check:
+                # Delta pruning: skip captures that cannot raise the score to alpha, and
+                # under-promotions, which a queen promotion always does better than
+                gain = PIECE_VALUES[squares[(move >> 6) & 63] & 7] if move >> 12 != EP_CAPTURE \
+                    else PIECE_VALUES[1]
+                if is_promotion(move):
+                    if promotion_type(move) != QUEEN:
+                        continue
+                    gain += PIECE_VALUES[QUEEN] - PIECE_VALUES[1]
+                if stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+                # Skip captures that lose material once the exchange on the square is over;
+                # taking a piece worth at least the capturing piece cannot
+                if (self.see and gain < PIECE_VALUES[squares[move & 63] & 7]
+                        and see(pos, move) < 0):
+                    self.see_prunes += 1
+                    continue
+
+            pos.make_move(move)
+            score = -self.qsearch(pos, -beta, -alpha, ply + 1)
+            pos.unmake_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def principal_variation(self, pos, best_move, depth):
+        """
+        Follow the best moves stored in the transposition table from the root.
+
+        Parameters:
+        - pos (Position): The root position.
+        - best_move (int): The root's best move.
+        - depth (int): The most moves to follow.
+
+        Returns:
+        - list: The principal variation.
+        """
+        pv = [best_move]
+        pos.make_move(best_move)
+        while len(pv) < depth:
+            move = self.table.best_move(pos.key)
+            if not move or move not in legal_moves(pos):
+                break
+            pv.append(move)
+            pos.make_move(move)
+        for _ in pv:
+            pos.unmake_move()
+        return pv
@@ -0,0 +1,89 @@
+"""
+Static exchange evaluation.
+
+see() works out what a capture wins once every piece that can join in has
+recaptured on the target square, each side always recapturing with its
+least valuable piece and stopping once recapturing would lose material.
+Nothing is moved on the position: the attackers come from the attack tables
+and the magic lookups, with the pieces that have already captured taken out
+of the occupancy, so sliders lined up behind them (x-rays) join in as the
+pieces in front leave. Pins are ignored.
+"""
+
+from engine.constants import PIECE_VALUES, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from engine.bitboard import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS
+from engine.magic import rook_attacks, bishop_attacks
+from engine.moves import EP_CAPTURE, is_promotion, promotion_type
+
+# Attackers are tried in this order, least valuable first
+ATTACKER_ORDER = (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)
+
+
+def see(pos, move):
+    """
+    Return the material a capture wins, or loses, once the exchange on its square is over.
+
+    Parameters:
+    - pos (Position): The position the move is played from.
+    - move (int): The encoded move, usually a capture or a promotion.
+
+    Returns:
+    - int: The material balance of the exchange for the side making the move, in
+      PIECE_VALUES units; negative when the capturing piece is lost for less.
+    """
+    bb = pos.bitboards
+    squares = pos.squares
+    from_sq = move & 63
+    to_sq = (move >> 6) & 63
+    us = squares[from_sq] >> 3
+    occupied = pos.occupied[0] | pos.occupied[1]
+
+    if move >> 12 == EP_CAPTURE:
+        gain = PIECE_VALUES[PAWN]
+        occupied ^= 1 << (to_sq - 8 if us == 0 else to_sq + 8)
+    else:
+        gain = PIECE_VALUES[squares[to_sq] & 7]
+    # The value of the piece now standing on the target square, which the next capture wins
+    on_square = PIECE_VALUES[squares[from_sq] & 7]
+    if is_promotion(move):
+        gain += PIECE_VALUES[promotion_type(move)] - PIECE_VALUES[PAWN]
+        on_square = PIECE_VALUES[promotion_type(move)]
+    occupied ^= 1 << from_sq
+
+    diagonal = bb[BISHOP] | bb[BISHOP | 8] | bb[QUEEN] | bb[QUEEN | 8]
+    straight = bb[ROOK] | bb[ROOK | 8] | bb[QUEEN] | bb[QUEEN | 8]
+    attackers = ((PAWN_ATTACKS[1][to_sq] & bb[PAWN]) | (PAWN_ATTACKS[0][to_sq] & bb[PAWN | 8])
+                 | (KNIGHT_ATTACKS[to_sq] & (bb[KNIGHT] | bb[KNIGHT | 8]))
+                 | (KING_ATTACKS[to_sq] & (bb[KING] | bb[KING | 8]))
+                 | (bishop_attacks(to_sq, occupied) & diagonal)
+                 | (rook_attacks(to_sq, occupied) & straight)) & occupied
+
+    # gains[d] is what the side capturing at depth d has won if the exchange stops there
+    gains = [gain]
+    side = us ^ 1
+    while True:
+        ours = attackers & pos.occupied[side]
+        if not ours:
+            break
+        for kind in ATTACKER_ORDER:
+            candidates = ours & bb[kind | side << 3]
+            if candidates:
+                break
+        if kind == KING and attackers & pos.occupied[side ^ 1]:
+            # The king cannot capture onto a square that is still defended
+            break
+        gains.append(on_square - gains[-1])
+        on_square = PIECE_VALUES[kind]
+        occupied ^= candidates & -candidates
+        # Sliders behind the piece that just captured now see the square
+        if kind == PAWN or kind == BISHOP or kind == QUEEN:
+            attackers |= bishop_attacks(to_sq, occupied) & diagonal
+        if kind == ROOK or kind == QUEEN:
+            attackers |= rook_attacks(to_sq, occupied) & straight
+        attackers &= occupied
+        side ^= 1
+
+    # Each side may stop the exchange instead of recapturing
+    for depth in range(len(gains) - 1, 0, -1):
+        gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+    return gains[0]
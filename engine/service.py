@@ -0,0 +1,398 @@
+"""
+An engine service that searches for many games at once.
+
+With several Boards in one process, a search on any thread holds the GIL and
+starves the others, drawing included. EngineService owns a pool of
+long-lived worker processes instead, each keeping its Searcher, and with it
+a warm transposition table, from one request to the next. A game submits a
+position and gets a future back; a listener thread resolves it when a worker
+sends the result.
+
+Positions travel as a FEN plus the moves played since the last capture or
+pawn move, which is all a search needs to spot repetitions, and results as
+a tuple of numbers. Requests wait in one queue per game and idle workers
+take from the queues in turn, so a game that submits many requests cannot
+hold back the others. A game's next request goes back to the worker that
+served its last one when that worker is free, where the table already
+holds the game's positions.
+"""
+
+import gc
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+
+from engine.position import Position
+from engine.search import Searcher, SearchResult, MAX_DEPTH
+from engine.timeman import MIN_MOVE_TIME
+from engine.worker import CancellationToken
+
+# Seconds the listener thread waits for results before checking for shutdown
+POLL_INTERVAL = 0.1
+
+# The service shared by every game in this process, see shared_service()
+_shared = None
+
+
+def encode_position(pos):
+    """
+    Pack a position into what a worker needs to rebuild it.
+
+    Parameters:
+    - pos (Position): The position to pack.
+
+    Returns:
+    - fen (str): The position before the moves below.
+    - moves (tuple): The moves since the last capture or pawn move, at least the last two.
+    """
+    plies = min(max(pos.halfmove_clock, 2), len(pos.history))
+    root = pos.copy()
+    for _ in range(plies):
+        root.unmake_move()
+    return root.fen(), tuple(entry[0] for entry in pos.history[len(pos.history) - plies:])
+
+
+def decode_position(fen, moves):
+    """Rebuild a position packed by encode_position."""
+    pos = Position(fen)
+    for move in moves:
+        pos.make_move(move)
+    return pos
+
+
+def _worker_main(connection, hash_mb, stop):
+    # Runs in a worker process until it is sent None. The process only searches, and
+    # reference counting frees everything a search allocates, so the collector is not needed
+    gc.disable()
+    searcher = Searcher(hash_mb)
+    token = CancellationToken(stop)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        request_id, fen, moves, max_depth, time_limit, node_limit, soft_limit = message
+        result = searcher.search(decode_position(fen, moves), max_depth, time_limit, node_limit, token,
+                                 soft_limit)
+        connection.send((request_id, result.best_move, result.score, result.depth, result.pv,
+                         result.nodes, result.elapsed))
+    connection.close()
+
+
+class ServiceRequest:
+    def __init__(self, request_id, game_id, position, max_depth, time_limit, node_limit, soft_limit=None):
+        """
+        Initialize the ServiceRequest object, a search waiting for or running on a worker.
+
+        Parameters:
+        - request_id (int): Number identifying the request within the service.
+        - game_id: The game the request belongs to.
+        - position (Position): The position to search.
+        - max_depth (int): The deepest iteration to run.
+        - time_limit (float): Seconds from submission after which to stop, or None.
+        - node_limit (int): Nodes after which to stop, or None for no limit.
+        - soft_limit (float): Seconds from submission the search should normally take, or None.
+        """
+        self.request_id = request_id
+        self.game_id = game_id
+        self.fen, self.moves = encode_position(position)
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.soft_limit = soft_limit
+        self.submitted = time.perf_counter()
+        self.future = Future()
+        self.worker = None
+
+
+class ServiceJob:
+    def __init__(self, service, request):
+        """
+        Initialize the ServiceJob object, the caller's handle on a submitted request. It
+        has the same done(), result() and cancel() as a SearchJob.
+
+        Parameters:
+        - service (EngineService): The service the request was submitted to.
+        - request (ServiceRequest): The request.
+        """
+        self.service = service
+        self.request = request
+        self._cancelled = False
+
+    def cancel(self):
+        """
+        Stop the search. A queued request is dropped and result() raises CancelledError;
+        a running one finishes with the best result found so far.
+        """
+        self._cancelled = True
+        self.service.cancel_request(self.request)
+
+    @property
+    def cancelled(self):
+        """True once cancel() has been called."""
+        return self._cancelled
+
+    def done(self):
+        """Return True once the search has finished and result() will not block."""
+        return self.request.future.done()
+
+    def result(self, timeout=None):
+        """Wait for the search and return its SearchResult."""
+        return self.request.future.result(timeout)
+
+    def add_done_callback(self, callback):
+        """Call callback(job) on the service's listener thread when the search finishes."""
+        self.request.future.add_done_callback(lambda _: callback(self))
+
+
+class EngineService:
+    def __init__(self, workers=2, hash_mb=16):
+        """
+        Initialize the EngineService object and start its worker processes.
+
+        Parameters:
+        - workers (int): Number of worker processes, each running one search at a time.
+        - hash_mb (float): Transposition table size of each worker in megabytes.
+        """
+        self.hash_mb = hash_mb
+        self.context = get_context("spawn")
+        self.lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        # Queued requests per game, and the games with any, in the order they are served
+        self.queues = {}
+        self.games = deque()
+        self.processes = []
+        self.connections = []
+        self.stop_events = []
+        self.idle = []
+        self.running = {}
+        self.last_worker = {}
+        self.completed = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.closed = False
+        # Set whenever a request is sent to a worker, to wake the listener thread
+        self.wakeup = threading.Event()
+        for index in range(max(1, workers)):
+            self._start_worker(index)
+        self.listener = threading.Thread(target=self._listen, name="engine-service", daemon=True)
+        self.listener.start()
+
+    def _start_worker(self, index):
+        connection, child = self.context.Pipe()
+        stop = self.context.Event()
+        process = self.context.Process(target=_worker_main, args=(child, self.hash_mb, stop),
+                                       name=f"engine-service-{index}", daemon=True)
+        process.start()
+        child.close()
+        if index < len(self.processes):
+            self.processes[index] = process
+            self.connections[index] = connection
+            self.stop_events[index] = stop
+        else:
+            self.processes.append(process)
+            self.connections.append(connection)
+            self.stop_events.append(stop)
+        self.idle.append(index)
+
+    def submit(self, game_id, position, max_depth=MAX_DEPTH, time_limit=None, node_limit=None, soft_limit=None):
+        """
+        Queue a search for a game.
+
+        Parameters:
+        - game_id: Any hashable value naming the game, used to share workers fairly.
+        - position (Position): The position to search. It is packed before this returns,
+          so the caller may keep playing on it.
+        - max_depth (int): The deepest iteration to run.
+        - time_limit (float): Seconds after which to stop, counted from now, so time spent
+          waiting in the queue is included. None for no limit.
+        - node_limit (int): Nodes after which to stop, or None for no limit.
+        - soft_limit (float): Seconds the search should normally take, see Searcher.search,
+          also counted from now. None for no soft limit.
+
+        Returns:
+        - ServiceJob: The queued search.
+        """
+        request = ServiceRequest(next(self.request_ids), game_id, position, max_depth, time_limit, node_limit,
+                                 soft_limit)
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("the engine service has been closed")
+            if game_id not in self.queues:
+                self.queues[game_id] = deque()
+                self.games.append(game_id)
+            self.queues[game_id].append(request)
+            self.max_queue_depth = max(self.max_queue_depth, self._queue_depth())
+            self._dispatch()
+        return ServiceJob(self, request)
+
+    def _queue_depth(self):
+        return sum(len(requests) for requests in self.queues.values())
+
+    def _dispatch(self):
+        # Hand queued requests to idle workers, one game at a time; called with the lock held
+        while self.idle and self.games:
+            game_id = self.games.popleft()
+            requests = self.queues[game_id]
+            request = requests.popleft()
+            if requests:
+                self.games.append(game_id)
+            else:
+                del self.queues[game_id]
+            if not request.future.set_running_or_notify_cancel():
+                continue
+
+            index = self.last_worker.get(game_id)
+            if index in self.idle:
+                self.idle.remove(index)
+            else:
+                index = self.idle.pop()
+            self.last_worker[game_id] = index
+            request.worker = index
+            self.running[index] = request
+
+            waited = time.perf_counter() - request.submitted
+            self.total_wait += waited
+            time_limit, soft_limit = request.time_limit, request.soft_limit
+            if time_limit is not None:
+                time_limit = max(time_limit - waited, MIN_MOVE_TIME)
+            if soft_limit is not None:
+                soft_limit = max(soft_limit - waited, MIN_MOVE_TIME)
+            self.stop_events[index].clear()
+            self.connections[index].send((request.request_id, request.fen, request.moves, request.max_depth,
+                                          time_limit, request.node_limit, soft_limit))
+            self.wakeup.set()
+
+    def _listen(self):
+        # Runs until the service is closed and the last running search has reported
+        while True:
+            self.wakeup.clear()
+            with self.lock:
+                busy = {self.connections[index]: index for index in self.running}
+            if not busy:
+                if self.closed:
+                    return
+                self.wakeup.wait(POLL_INTERVAL)
+                continue
+            for connection in wait(list(busy), POLL_INTERVAL):
+                index = busy[connection]
+                try:
+                    request_id, best_move, score, depth, pv, nodes, elapsed = connection.recv()
+                except (EOFError, OSError):
+                    self._worker_died(index)
+                    continue
+                with self.lock:
+                    request = self.running.pop(index)
+                    self.idle.append(index)
+                    self.completed += 1
+                    self._dispatch()
+                request.future.set_result(SearchResult(best_move, score, depth, pv, nodes, elapsed))
+
+    def _worker_died(self, index):
+        with self.lock:
+            request = self.running.pop(index, None)
+            if not self.closed:
+                self._start_worker(index)
+                self._dispatch()
+        if request is not None:
+            request.future.set_exception(RuntimeError(f"engine worker {index} exited during a search"))
+
+    def cancel_request(self, request):
+        """
+        Drop a queued request, or stop a running one at its next limit check.
+
+        Parameters:
+        - request (ServiceRequest): The request to cancel.
+        """
+        with self.lock:
+            requests = self.queues.get(request.game_id)
+            if requests is not None and request in requests:
+                requests.remove(request)
+                if not requests:
+                    del self.queues[request.game_id]
+                    self.games.remove(request.game_id)
+                request.future.cancel()
+            elif self.running.get(request.worker) is request:
+                self.stop_events[request.worker].set()
+
+    def cancel_game(self, game_id):
+        """Cancel every queued and running request of a game."""
+        with self.lock:
+            requests = list(self.queues.get(game_id, ()))
+            requests += [request for request in self.running.values() if request.game_id == game_id]
+        for request in requests:
+            self.cancel_request(request)
+
+    def queue_depth(self):
+        """Return the number of requests waiting for a worker."""
+        with self.lock:
+            return self._queue_depth()
+
+    def stats(self):
+        """
+        Report how busy the service is.
+
+        Returns:
+        - dict: Requests queued, per game and in total, the most ever queued at once,
+          requests running and completed, workers, and the mean seconds a request waited
+          for a worker.
+        """
+        with self.lock:
+            started = self.completed + len(self.running)
+            return {
+                "queue_depth": self._queue_depth(),
+                "queued_by_game": {game_id: len(requests) for game_id, requests in self.queues.items()},
+                "max_queue_depth": self.max_queue_depth,
+                "running": len(self.running),
+                "completed": self.completed,
+                "workers": len(self.processes),
+                "mean_wait": self.total_wait / started if started else 0.0,
+            }
+
+    def close(self):
+        """
+        Drop the queued requests, stop the running ones, and shut the workers and the
+        listener thread down once the running ones have reported their results.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            for requests in self.queues.values():
+                for request in requests:
+                    request.future.cancel()
+            self.queues.clear()
+            self.games.clear()
+            for index in self.running:
+                self.stop_events[index].set()
+        self.wakeup.set()
+        self.listener.join()
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(POLL_INTERVAL * 50)
+            if process.is_alive():
+                process.terminate()
+
+
+def shared_service(workers=2, hash_mb=16):
+    """
+    Return the service shared by every game in this process, starting it on first use.
+
+    Parameters:
+    - workers (int): Number of worker processes, used when the service is started.
+    - hash_mb (float): Transposition table size of each worker, used when the service is started.
+
+    Returns:
+    - EngineService: The shared service.
+    """
+    global _shared
+    if _shared is None or _shared.closed:
+        _shared = EngineService(workers, hash_mb)
+    return _shared
@@ -0,0 +1,72 @@
+"""
+Time management for the computer player.
+
+Given the time left on the computer's clock, allocate_time() picks two
+budgets for the next move. The soft budget is what the move should normally
+take: iterative deepening does not start a new iteration once it is mostly
+spent, and stops sooner when the best move has stayed the same for several
+iterations. The hard budget is a limit the search is cut off at no matter
+what, kept well inside the clock so the computer never loses on time.
+
+The budgets are a share of the clock based on how many moves are likely to
+be left, which depends on the game phase: with most pieces still on the
+board a game has more moves to go than in an endgame.
+"""
+
+from engine.constants import KNIGHT, BISHOP, ROOK, QUEEN, WHITE, BLACK, make_piece
+
+# Phase weight of each piece type; all pieces on the board add up to PHASE_TOTAL
+PHASE_WEIGHTS = {KNIGHT: 1, BISHOP: 1, ROOK: 2, QUEEN: 4}
+PHASE_TOTAL = 24
+
+# Moves expected to be left with all pieces on the board, and with none
+OPENING_MOVES_TO_GO = 45
+ENDGAME_MOVES_TO_GO = 25
+
+# Seconds kept back each move for animations and handing the move to the window
+MOVE_OVERHEAD = 0.3
+MIN_MOVE_TIME = 0.05
+# The hard budget is at most this many soft budgets and this share of the clock
+HARD_FACTOR = 4
+MAX_CLOCK_SHARE = 0.2
+
+
+def game_phase(pos):
+    """
+    Measure how much material is left on the board.
+
+    Parameters:
+    - pos (Position): The position to measure.
+
+    Returns:
+    - float: 1.0 with every knight, bishop, rook and queen on the board, down to 0.0
+      with only kings and pawns.
+    """
+    phase = 0
+    for kind, weight in PHASE_WEIGHTS.items():
+        phase += weight * (pos.bitboards[make_piece(WHITE, kind)].bit_count()
+                           + pos.bitboards[make_piece(BLACK, kind)].bit_count())
+    return min(phase, PHASE_TOTAL) / PHASE_TOTAL
+
+
+def allocate_time(pos, remaining, increment=0.0):
+    """
+    Choose the soft and hard time budgets for the next move.
+
+    Parameters:
+    - pos (Position): The position the computer is about to move in.
+    - remaining (float): Seconds left on the computer's clock.
+    - increment (float): Seconds added to the clock after each move.
+
+    Returns:
+    - soft (float): Seconds the move should normally take.
+    - hard (float): Seconds after which the search must stop.
+    """
+    usable = max(remaining - MOVE_OVERHEAD, MIN_MOVE_TIME)
+    phase = game_phase(pos)
+    moves_to_go = ENDGAME_MOVES_TO_GO + (OPENING_MOVES_TO_GO - ENDGAME_MOVES_TO_GO) * phase
+
+    soft = usable / moves_to_go + increment * 0.75
+    hard = min(soft * HARD_FACTOR, usable * MAX_CLOCK_SHARE)
+    hard = max(hard, MIN_MOVE_TIME)
+    return min(soft, hard), hard
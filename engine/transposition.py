@@ -0,0 +1,211 @@
+"""
+Transposition table for the computer player's search.
+
+The table is a fixed number of buckets, each holding BUCKET_SIZE entries.
+Entries live in flat arrays rather than Python objects so the memory used is
+predictable: every entry is a 64-bit key, a score and a 32-bit word packing
+the best move, the search depth, the bound type and the generation.
+
+The table is kept from one move of the game to the next. Each search starts
+a new generation, and entries left over from earlier searches are the first
+to be replaced, ahead of shallow entries from the current one.
+
+The arrays can also be laid over a shared memory buffer so that searches in
+several processes share one table. Writes are not locked, so each entry's
+key is stored XORed with its data word and with the bits of its score: an
+entry half written by another process no longer matches its key and is
+treated as a miss. The score is read through a second view of the scores as
+64-bit words, and a probe checks and returns the bits it read, so it never
+returns a score that another process wrote after the check.
+"""
+
+from array import array
+
+BUCKET_SIZE = 4
+
+# Bound types
+BOUND_NONE = 0
+BOUND_LOWER = 1
+BOUND_UPPER = 2
+BOUND_EXACT = 3
+
+# Bytes per entry: 8 (key) + 8 (score) + 4 (move, depth, bound, generation)
+ENTRY_BYTES = 20
+
+# Generations wrap around after this many searches
+GENERATIONS = 64
+# Each search an entry is out of date counts as this many plies of depth when replacing
+AGE_WEIGHT = 8
+
+
+def table_bytes(size_mb):
+    """Return the number of bytes a table with the given memory budget uses."""
+    return max(1, int(size_mb * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SIZE)) * BUCKET_SIZE * ENTRY_BYTES
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16, buffer=None):
+        """
+        Initialize the TranspositionTable object.
+
+        Parameters:
+        - size_mb (float): Memory budget for the table in megabytes.
+        - buffer: A writable buffer of table_bytes(size_mb) bytes to keep the entries in,
+          such as a SharedMemory's buf, or None for private arrays. A table laid over a
+          buffer uses the entries already in it.
+        """
+        self.size_mb = size_mb
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SIZE))
+        self.entries = self.buckets * BUCKET_SIZE
+        self.buffer = buffer
+        if buffer is None:
+            self.clear()
+            return
+        raw = memoryview(buffer).cast('B')[:self.entries * ENTRY_BYTES]
+        self.keys = raw[:8 * self.entries].cast('Q')
+        self.scores = raw[8 * self.entries:16 * self.entries].cast('d')
+        self.score_bits = raw[8 * self.entries:16 * self.entries].cast('Q')
+        self.data = raw[16 * self.entries:].cast('I')
+        self.raw = raw
+        self._init_scratch()
+        self.generation = 0
+        self.used = 0
+        self.reset_stats()
+
+    def clear(self):
+        """Empty the table and reset its statistics."""
+        if self.buffer is None:
+            self.keys = array('Q', bytes(8 * self.entries))
+            self.scores = array('d', bytes(8 * self.entries))
+            self.score_bits = memoryview(self.scores).cast('B').cast('Q')
+            self.data = array('I', bytes(4 * self.entries))
+            self._init_scratch()
+        else:
+            self.raw[:] = bytes(len(self.raw))
+        self.generation = 0
+        self.used = 0
+        self.reset_stats()
+
+    def _init_scratch(self):
+        # One 64-bit word seen both as bits and as a float, to turn checked bits into a score
+        self.scratch = array('Q', [0])
+        self.scratch_score = memoryview(self.scratch).cast('B').cast('d')
+
+    def release(self):
+        """Let go of the buffer the table is laid over, so its owner can close it."""
+        if self.buffer is not None:
+            for view in (self.keys, self.scores, self.score_bits, self.data, self.raw):
+                view.release()
+            self.buffer = None
+
+    def new_search(self):
+        """Start a new generation, so entries stored before now age out first."""
+        self.generation = (self.generation + 1) % GENERATIONS
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the probe, hit and store counters."""
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key):
+        """
+        Look a position up in the table.
+
+        Parameters:
+        - key (int): The position's Zobrist key.
+
+        Returns:
+        - tuple: (move, depth, bound, score) if the position is stored, otherwise None.
+        """
+        self.probes += 1
+        keys = self.keys
+        entries = self.data
+        score_bits = self.score_bits
+        index = (key % self.buckets) * BUCKET_SIZE
+        for slot in range(index, index + BUCKET_SIZE):
+            data = entries[slot]
+            bits = score_bits[slot]
+            if keys[slot] ^ data ^ bits == key:
+                self.hits += 1
+                self.scratch[0] = bits
+                return data & 0xFFFF, (data >> 16) & 0xFF, (data >> 24) & 3, self.scratch_score[0]
+        return None
+
+    def best_move(self, key):
+        """Return the stored best move for a position, or 0 if there is none."""
+        index = (key % self.buckets) * BUCKET_SIZE
+        for slot in range(index, index + BUCKET_SIZE):
+            data = self.data[slot]
+            if self.keys[slot] ^ data ^ self.score_bits[slot] == key:
+                return data & 0xFFFF
+        return 0
+
+    def store(self, key, move, depth, bound, score):
+        """
+        Store a search result. An entry for the same position is overwritten; otherwise
+        an empty slot in the bucket is used, and failing that the entry that is least
+        worth keeping: the shallowest, with entries from earlier searches counted as
+        AGE_WEIGHT plies shallower for every search they are out of date.
+
+        Parameters:
+        - key (int): The position's Zobrist key.
+        - move (int): The best move found, or 0.
+        - depth (int): The remaining depth the position was searched to.
+        - bound (int): BOUND_EXACT, BOUND_LOWER or BOUND_UPPER.
+        - score (float): The score from the side to move's point of view.
+        """
+        keys = self.keys
+        data = self.data
+        score_bits = self.score_bits
+        index = (key % self.buckets) * BUCKET_SIZE
+        generation = self.generation
+        replace = index
+        replace_worth = 1 << 30
+        for slot in range(index, index + BUCKET_SIZE):
+            stored = keys[slot]
+            slot_data = data[slot]
+            if stored ^ slot_data ^ score_bits[slot] == key:
+                # Keep the old best move if the new search did not find one
+                if not move:
+                    move = slot_data & 0xFFFF
+                replace = slot
+                break
+            if stored == 0:
+                replace = slot
+                self.used += 1
+                break
+            age = (generation - (slot_data >> 26)) % GENERATIONS
+            worth = ((slot_data >> 16) & 0xFF) - age * AGE_WEIGHT
+            if worth < replace_worth:
+                replace = slot
+                replace_worth = worth
+
+        self.stores += 1
+        word = ((move & 0xFFFF) | (min(max(depth, 0), 255) << 16) | (bound << 24)
+                | (generation << 26))
+        data[replace] = word
+        self.scores[replace] = score
+        keys[replace] = key ^ word ^ score_bits[replace]
+
+    def hashfull(self):
+        """Return how full the table is, in parts per thousand."""
+        return self.used * 1000 // self.entries
+
+    def stats(self):
+        """
+        Report how the table has been used since the current search started.
+
+        Returns:
+        - dict: Probe, hit and store counts, the hit rate and the fill level.
+        """
+        return {
+            "entries": self.entries,
+            "generation": self.generation,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "stores": self.stores,
+            "hashfull": self.hashfull(),
+        }
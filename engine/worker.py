@@ -0,0 +1,196 @@
+"""
+Background searches for the computer player.
+
+The arcade window runs its event loop on the main thread, so a search run
+there freezes drawing, animations and the clocks until it returns.
+EngineWorker runs each search on a background thread instead and hands back
+a SearchJob straight away. The job is a future: the caller can poll done()
+and progress() from on_update, add a callback, or cancel() it, and the
+search notices the cancellation within CHECK_INTERVAL nodes.
+
+A worker owns one Searcher, which is not thread-safe, so it runs one search
+at a time; starting a new search cancels the one still running.
+"""
+
+import threading
+from concurrent.futures import Future
+
+from engine.search import MAX_DEPTH
+
+
+class CancellationToken:
+    def __init__(self, event=None):
+        """
+        Initialize the CancellationToken object, not yet cancelled.
+
+        Parameters:
+        - event: The event to set on cancel(), such as a multiprocessing.Event shared
+          with another process, or None for a new threading.Event.
+        """
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        """Ask whatever holds the token to stop."""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """True once cancel() has been called."""
+        return self._event.is_set()
+
+
+class SearchJob:
+    def __init__(self, searcher, position, max_depth, time_limit, node_limit, soft_limit=None):
+        """
+        Initialize the SearchJob object. The search starts when start() is called.
+
+        Parameters:
+        - searcher (Searcher): The searcher to run.
+        - position (Position): The position to search, already copied by the caller.
+        - max_depth (int): The deepest iteration to run.
+        - time_limit (float): Seconds after which to stop, or None for no limit.
+        - node_limit (int): Nodes after which to stop, or None for no limit.
+        - soft_limit (float): Seconds the search should normally take, or None.
+        """
+        self.searcher = searcher
+        self.position = position
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.soft_limit = soft_limit
+        self.token = CancellationToken()
+        self.future = Future()
+        self.thread = threading.Thread(target=self._run, name="engine-search", daemon=True)
+
+    def start(self):
+        """Start the search on its background thread."""
+        self.future.set_running_or_notify_cancel()
+        self.thread.start()
+
+    def _run(self):
+        try:
+            result = self.searcher.search(self.position, self.max_depth, self.time_limit, self.node_limit,
+                                          self.token, self.soft_limit)
+        except BaseException as error:
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(result)
+
+    def cancel(self):
+        """
+        Stop the search. A cancelled job still finishes with the best result found so
+        far, so the caller can decide whether to use it.
+        """
+        self.token.cancel()
+
+    @property
+    def cancelled(self):
+        """True once cancel() has been called."""
+        return self.token.cancelled
+
+    def ponderhit(self, time_limit=None, soft_limit=None):
+        """
+        Turn a search started without time limits into a timed one, see Searcher.ponderhit.
+
+        Parameters:
+        - time_limit (float): Seconds from now after which to stop, or None for no limit.
+        - soft_limit (float): Seconds the whole search should normally take, or None.
+        """
+        self.searcher.ponderhit(time_limit, soft_limit)
+
+    def done(self):
+        """Return True once the search has finished and result() will not block."""
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """
+        Wait for the search and return its result.
+
+        Parameters:
+        - timeout (float): Seconds to wait, or None to wait for as long as it takes.
+
+        Returns:
+        - SearchResult: The result of the deepest completed iteration.
+        """
+        return self.future.result(timeout)
+
+    def add_done_callback(self, callback):
+        """
+        Call callback(job) when the search finishes. The callback runs on the search
+        thread, or straight away if the search has already finished, so it must not
+        touch the window; poll done() from on_update for that.
+        """
+        self.future.add_done_callback(lambda _: callback(self))
+
+    def progress(self):
+        """
+        Report how far the search has got. Safe to call from any thread while it runs.
+
+        Returns:
+        - dict: The depth, best move, score and principal variation of the deepest
+          finished iteration (0, 0, 0 and [] before the first one finishes), plus the
+          nodes searched so far.
+        """
+        latest = self.searcher.progress
+        return {
+            "depth": latest.depth if latest else 0,
+            "best_move": latest.best_move if latest else 0,
+            "score": latest.score if latest else 0,
+            "pv": list(latest.pv) if latest else [],
+            "nodes": self.searcher.nodes,
+        }
+
+    def join(self, timeout=None):
+        """Wait for the search thread to exit."""
+        self.thread.join(timeout)
+
+
+class EngineWorker:
+    def __init__(self, searcher):
+        """
+        Initialize the EngineWorker object.
+
+        Parameters:
+        - searcher (Searcher): The searcher to run searches with. It keeps its tables
+          between searches as usual.
+        """
+        self.searcher = searcher
+        self.job = None
+        self.lock = threading.Lock()
+
+    def start_search(self, position, max_depth=MAX_DEPTH, time_limit=None, node_limit=None, callback=None,
+                     soft_limit=None):
+        """
+        Start searching a position in the background, cancelling any search still running.
+
+        Parameters:
+        - position (Position): The position to search. It is copied before this returns,
+          so the caller may keep playing on it.
+        - max_depth (int): The deepest iteration to run.
+        - time_limit (float): Seconds after which to stop, or None for no limit.
+        - node_limit (int): Nodes after which to stop, or None for no limit.
+        - callback (function): Called as callback(job) when the search finishes, or None.
+        - soft_limit (float): Seconds the search should normally take, or None.
+
+        Returns:
+        - SearchJob: The running search.
+        """
+        with self.lock:
+            self.stop()
+            job = SearchJob(self.searcher, position.copy(), max_depth, time_limit, node_limit, soft_limit)
+            if callback is not None:
+                job.add_done_callback(callback)
+            self.job = job
+            job.start()
+            return job
+
+    def stop(self):
+        """Cancel the running search, if any, and wait for its thread to exit."""
+        job = self.job
+        if job is not None and not job.done():
+            job.cancel()
+            job.join()
+
+    def busy(self):
+        """Return True while a search is running."""
+        return self.job is not None and not self.job.done()
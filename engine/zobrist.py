@@ -0,0 +1,63 @@
+"""
+Zobrist hashing keys.
+
+Each (piece, square) pair, the side to move, each castling-rights value and
+each en passant file gets a fixed random 64-bit number. A position's key is
+the XOR of the numbers for everything in it, so the Position can update its
+key incrementally as pieces move. The generator is seeded so keys are the
+same in every process.
+
+The pawn key is the XOR of the pawns' numbers alone, so it only changes when
+a pawn moves, is captured or promotes; the evaluation caches pawn-structure
+scores under it.
+"""
+
+import random
+
+_rng = random.Random(20240415)
+
+# Indexed by piece code, then square
+PIECE_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(15)]
+SIDE_KEY = _rng.getrandbits(64)
+CASTLING_KEYS = [_rng.getrandbits(64) for _ in range(16)]
+EP_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+# PIECE_KEYS for pawns and 0 for every other piece, so a pawn key update needs no test
+PAWN_KEYS = [PIECE_KEYS[piece] if piece & 7 == 1 else [0] * 64 for piece in range(15)]
+
+
+def compute_key(pos):
+    """
+    Compute a position's Zobrist key from scratch.
+
+    Parameters:
+    - pos (Position): The position to hash.
+
+    Returns:
+    - int: The 64-bit key.
+    """
+    key = 0
+    for sq, piece in enumerate(pos.squares):
+        if piece:
+            key ^= PIECE_KEYS[piece][sq]
+    if pos.turn:
+        key ^= SIDE_KEY
+    key ^= CASTLING_KEYS[pos.castling]
+    if pos.ep_square is not None:
+        key ^= EP_KEYS[pos.ep_square & 7]
+    return key
+
+
+def compute_pawn_key(pos):
+    """
+    Compute the Zobrist key of a position's pawns from scratch.
+
+    Parameters:
+    - pos (Position): The position to hash.
+
+    Returns:
+    - int: The 64-bit pawn key.
+    """
+    key = 0
+    for sq, piece in enumerate(pos.squares):
+        key ^= PAWN_KEYS[piece][sq]
+    return key